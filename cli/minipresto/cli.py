@@ -57,8 +57,18 @@ class CommandLineInterface(click.MultiCommand):
         'provision' command."""
     ),
 )
+@click.option(
+    "--log-file",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help=(
+        """Append all output, including verbose output and the output of
+        commands executed in the shell and in containers, to a file. Messages
+        are written without prefixes or formatting."""
+    ),
+)
 @pass_environment
-def cli(ctx, verbose, env):
+def cli(ctx, verbose, env, log_file):
     """Welcome to the Minipresto command line interface.
 
     To report issues and ask questions, please file a GitHub issue and apply a
@@ -66,4 +76,7 @@ def cli(ctx, verbose, env):
     https://github.com/jefflester/minipresto
     """
 
-    ctx._user_init(verbose, env)
+    ctx._user_init(verbose, env, log_file)
+
+    # Flush buffered output and close the log file once the command completes
+    click.get_current_context().call_on_close(ctx.logger.close)
@@ -7,7 +7,13 @@ import click
 from minipresto.cli import pass_environment
 from minipresto import utils
 from minipresto import errors as err
+from minipresto.cmd.cmd_provision import provision
+from minipresto.cmd.cmd_provision import clear_fingerprint
 from minipresto.settings import RESOURCE_LABEL
+from minipresto.settings import MODULE_LABEL_KEY_ROOT
+from minipresto.settings import STOP_GRACE_PERIOD
+
+from docker.errors import APIError
 
 
 @click.command(
@@ -18,6 +24,26 @@ from minipresto.settings import RESOURCE_LABEL
         removed."""
     ),
 )
+@click.option(
+    "-m",
+    "--module",
+    "modules",
+    default=[],
+    type=str,
+    multiple=True,
+    help=(
+        """A specific module to bring down. Other modules are left running. If
+        the module mounts files into the Presto container, Presto is recreated
+        without them."""
+    ),
+)
+@click.option(
+    "-v",
+    "--volumes",
+    is_flag=True,
+    default=False,
+    help=("""Remove the volumes of the modules passed to `--module`."""),
+)
 @click.option(
     "-k",
     "--keep",
@@ -36,13 +62,37 @@ from minipresto.settings import RESOURCE_LABEL
 )
 @utils.exception_handler
 @pass_environment
-def cli(ctx, sig_kill, keep):
+def cli(ctx, modules, volumes, sig_kill, keep):
     """Down command for Minipresto. Exits with a 0 status code if there are no
     running minipresto containers."""
 
     utils.check_daemon(ctx.docker_client)
     utils.check_lib(ctx)
 
+    if volumes and not modules:
+        raise err.UserError(
+            f"The '--volumes' option can only be used with '--module'.",
+            f"To remove all Minipresto volumes, run 'minipresto remove --volumes'.",
+        )
+    if volumes and keep:
+        raise err.UserError(
+            f"The '--volumes' and '--keep' options cannot be used together, as "
+            f"volumes cannot be removed while containers use them."
+        )
+
+    if sig_kill:
+        stop_timeout = 1
+        ctx.logger.log(
+            "Stopping Minipresto containers with sig-kill...",
+            level=ctx.logger.verbose,
+        )
+    else:
+        stop_timeout = ctx.env.get_int_var("STOP_GRACE_PERIOD", STOP_GRACE_PERIOD)
+
+    if modules:
+        down_modules(modules, volumes, stop_timeout, keep)
+        return
+
     containers = ctx.docker_client.containers.list(
         filters={"label": RESOURCE_LABEL}, all=True
     )
@@ -51,31 +101,104 @@ def cli(ctx, sig_kill, keep):
         ctx.logger.log("No containers to bring down.")
         sys.exit(0)
 
-    if sig_kill:
-        stop_timeout = 1
-        ctx.logger.log(
-            "Stopping Minipresto containers with sig-kill...",
-            level=ctx.logger.verbose,
+    utils.teardown_containers(ctx, containers, stop_timeout, remove=not keep)
+    ctx.logger.log("Brought down all Minipresto containers.")
+
+
+@pass_environment
+def down_modules(ctx, modules=[], volumes=False, stop_timeout=1, keep=False):
+    """Brings down the containers (and optionally the volumes) of the given
+    modules, leaving all other containers running. Each module's resources are
+    found with a single list call filtered on its
+    `com.starburst.tests.module.<module>` label.
+
+    If a module mounts files into the Presto container (e.g. a catalog
+    properties file), Presto is removed and re-provisioned with the other
+    modules that were running, including those that only mount files into
+    Presto. Bind mounts are part of a container's configuration, so restarting
+    Presto would not drop the module's files. This is why `--keep` cannot be
+    used with such modules. Otherwise, the provisioning
+    fingerprint in Presto is cleared so the modules can be provisioned
+    again."""
+
+    containers = {}
+    recreate_presto = False
+    for module in modules:
+        module_obj = ctx.modules.data.get(module)
+        if module_obj is None:
+            raise err.UserError(
+                f"Invalid module: '{module}'. It was not found "
+                f"in the Minipresto library at {ctx.minipresto_lib_dir}"
+            )
+        presto_service = module_obj.yaml_dict.get("services", {}).get("presto", {})
+        if presto_service and presto_service.get("volumes"):
+            recreate_presto = True
+
+        for container in ctx.docker_client.containers.list(
+            all=True, filters={"label": f"{MODULE_LABEL_KEY_ROOT}.{module}"}
+        ):
+            # Modules can label the Presto container, but it is only ever
+            # recreated, never brought down with a module
+            if container.name == "presto":
+                recreate_presto = True
+            else:
+                containers[container.id] = container
+
+    presto = ctx.docker_client.containers.list(
+        filters={"label": RESOURCE_LABEL, "name": "^/presto$"}
+    )
+    recreate_presto = recreate_presto and bool(presto)
+    if recreate_presto and keep:
+        raise err.UserError(
+            f"The '--keep' option cannot be used with modules that mount files "
+            f"into the Presto container, as Presto must be removed and recreated "
+            f"to drop the files: {list(modules)}",
+            f"Bring the modules down without '--keep'.",
         )
-    else:
-        stop_timeout = 10
 
-    # Stop
-    for container in containers:
-        identifier = utils.generate_identifier(
-            {"ID": container.short_id, "Name": container.name}
+    if not containers and not recreate_presto:
+        ctx.logger.log(f"No containers to bring down for modules: {list(modules)}")
+        sys.exit(0)
+
+    # Presto-only modules have no containers of their own, so the modules to
+    # re-provision Presto with are captured before anything is torn down
+    remaining = [
+        module for module in ctx.modules.get_running_modules() if module not in modules
+    ]
+
+    utils.teardown_containers(
+        ctx, list(containers.values()), stop_timeout, remove=not keep
+    )
+    ctx.modules.invalidate_running_modules()
+    if volumes:
+        remove_module_volumes(modules)
+    ctx.logger.log(f"Brought down modules: {list(modules)}")
+
+    if presto and not recreate_presto:
+        clear_fingerprint(presto[0])
+    if recreate_presto:
+        ctx.logger.log(
+            f"Recreating the Presto container without the files mounted by "
+            f"modules {list(modules)}..."
         )
-        if container.status == "running":
-            container.stop(timeout=stop_timeout)
-            ctx.logger.log(f"Stopped container: {identifier}", level=ctx.logger.verbose)
-
-    # Remove
-    if not keep:
-        for container in containers:
-            identifier = utils.generate_identifier(
-                {"ID": container.short_id, "Name": container.name}
-            )
-            container.remove()
-            ctx.logger.log(f"Removed container: {identifier}", level=ctx.logger.verbose)
+        utils.teardown_containers(ctx, presto, stop_timeout)
+        ctx.modules.invalidate_running_modules()
+        provision(remaining)
 
-    ctx.logger.log("Brought down all Minipresto containers.")
+
+@pass_environment
+def remove_module_volumes(ctx, modules=[]):
+    """Removes the volumes labeled with any of the given modules."""
+
+    for module in modules:
+        for volume in ctx.docker_client.volumes.list(
+            filters={"label": f"{MODULE_LABEL_KEY_ROOT}.{module}"}
+        ):
+            try:
+                volume.remove()
+            except APIError as e:
+                raise err.MiniprestoError(
+                    f"Failed to remove volume '{volume.name}' of module "
+                    f"'{module}': {e}"
+                )
+            ctx.logger.log(f"Removed volume: {volume.name}", level=ctx.logger.verbose)
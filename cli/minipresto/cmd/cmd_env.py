@@ -0,0 +1,75 @@
+#!usr/bin/env/python3
+# -*- coding: utf-8 -*-
+
+import click
+import json
+
+from minipresto.cli import pass_environment
+from minipresto import errors as err
+from minipresto import utils
+from minipresto.cmd.cmd_snapshot import scrub_value
+
+
+@click.command(
+    "env",
+    help=(
+        """Display environment variables and the source each value was resolved
+        from (the `--env` option, a `minipresto.cfg` section, or the library's
+        `minipresto.env` file). Sensitive values are scrubbed unless
+        `--no-scrub` is passed."""
+    ),
+)
+@click.option(
+    "-k",
+    "--key",
+    "keys",
+    default=[],
+    type=str,
+    multiple=True,
+    help=("""A specific environment variable to display."""),
+)
+@click.option(
+    "-j",
+    "--json",
+    "json_format",
+    is_flag=True,
+    default=False,
+    help=("""Print the environment variables in JSON form."""),
+)
+@click.option(
+    "--no-scrub",
+    is_flag=True,
+    default=False,
+    help=(
+        """Do not scrub sensitive values (passwords and keys) from the
+        output."""
+    ),
+)
+@utils.exception_handler
+@pass_environment
+def cli(ctx, keys, json_format, no_scrub):
+    """Env command for Minipresto."""
+
+    if keys:
+        env_vars = []
+        for key in keys:
+            value = ctx.env.get_var(key)
+            if value is None:
+                raise err.UserError(
+                    f"Environment variable not found: {key}",
+                    "Run 'minipresto env' to see all environment variables.",
+                )
+            env_vars.append((key.upper(), value, ctx.env.get_source(key)))
+    else:
+        env_vars = [(k, v, source) for k, v, _, source in ctx.env.items()]
+
+    if not no_scrub:
+        env_vars = [(k, scrub_value(k, v), source) for k, v, source in env_vars]
+
+    if json_format:
+        env_dict = {k: {"value": v, "source": source} for k, v, source in env_vars}
+        ctx.logger.log(json.dumps(env_dict, indent=2))
+        return
+
+    for k, v, source in env_vars:
+        ctx.logger.log(f"{k}={v} {utils.generate_identifier({'Source': source})}")
@@ -78,7 +78,7 @@ def log_info(ctx, module_name="", module_dict={}, json_format=False):
     """Logs module metadata to the user's terminal."""
 
     if json_format:
-        module_dict = {module_name: module_dict}
+        module_dict = {module_name: module_dict.to_dict()}
         ctx.logger.log(json.dumps(module_dict, indent=2))
     else:
         description = module_dict.get("description", "")
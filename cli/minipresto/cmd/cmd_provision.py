@@ -7,23 +7,37 @@
 # files, and Minipresto benefits hugely from Docker Compose.
 
 import os
-import stat
 import hashlib
-import time
 import click
 
 from minipresto.cli import pass_environment
 from minipresto import utils
 from minipresto import errors as err
+from minipresto.components import ReadinessMonitor
+from minipresto.components import ProvisionJournal
 from minipresto.settings import RESOURCE_LABEL
+from minipresto.settings import COMPOSE_SERVICE_LABEL
+from minipresto.settings import COMPOSE_CONFIG_HASH_LABEL
 from minipresto.settings import MODULE_ROOT
 from minipresto.settings import MODULE_CATALOG
 from minipresto.settings import MODULE_SECURITY
+from minipresto.settings import MODULE_RESOURCES
 from minipresto.settings import ETC_PRESTO
 from minipresto.settings import PRESTO_CONFIG
 from minipresto.settings import PRESTO_JVM_CONFIG
+from minipresto.settings import BOOTSTRAP_CONCURRENCY
+from minipresto.settings import PRESTO_READY_PATTERN
+from minipresto.settings import PRESTO_READY_TIMEOUT
+from minipresto.settings import BOOTSTRAP_DIR
+from minipresto.settings import BOOTSTRAP_STATUS_FILE
+from minipresto.settings import RESOURCES_DIR
+from minipresto.settings import DOCKER_POOL_SIZE
+from minipresto.settings import STOP_GRACE_PERIOD
+from minipresto.settings import FINGERPRINT_FILE
+from minipresto.settings import SNAPSHOT_ROOT_FILES
 
 from docker.errors import NotFound
+from docker.errors import APIError
 
 
 @click.command(
@@ -68,16 +82,77 @@ from docker.errors import NotFound
         --force-recreate'"""
     ),
 )
+@click.option(
+    "-p",
+    "--plan",
+    is_flag=True,
+    default=False,
+    help=(
+        """Display which services would be created, recreated, started, or left
+        unchanged, then exit without provisioning."""
+    ),
+)
+@click.option(
+    "-t",
+    "--trace",
+    default="",
+    type=click.Path(dir_okay=False, writable=True),
+    help=(
+        """Record how long each provisioning phase, Docker API request, and
+        command takes, and write the timings to a file in Chrome's trace-event
+        format. A summary of the time spent in each phase is also displayed."""
+    ),
+)
+@click.option(
+    "-r",
+    "--resume",
+    is_flag=True,
+    default=False,
+    help=(
+        """Resume a provision that failed with `--no-rollback` from its first
+        incomplete phase. Completed phases and successful bootstrap scripts are
+        not run again."""
+    ),
+)
 @utils.exception_handler
 @pass_environment
-def cli(ctx, modules, no_rollback, docker_native):
+def cli(ctx, modules, no_rollback, docker_native, plan, trace, resume):
     """Provision command for Minipresto. If the resulting docker-compose command
     is unsuccessful, the function exits with a non-zero status code."""
 
-    utils.check_daemon(ctx.docker_client)
-    utils.check_lib(ctx)
-    modules = append_running_modules(modules)
-    check_compatibility(modules)
+    if plan and resume:
+        raise err.UserError(
+            f"The '--plan' and '--resume' options cannot be used together."
+        )
+
+    try:
+        provision(modules, no_rollback, docker_native, plan, resume)
+    finally:
+        if trace:
+            ctx.tracer.write(trace)
+            ctx.tracer.log_summary(ctx.logger)
+            ctx.logger.log(f"Provisioning trace written to: {trace}")
+
+
+@pass_environment
+def provision(
+    ctx, modules=[], no_rollback=False, docker_native="", plan=False, resume=False
+):
+    """Provisions an environment with the given modules. Each phase is recorded
+    as a span by the environment's tracer, and each completed phase is recorded
+    in the provisioning journal so that a failed provision can be resumed."""
+
+    span = ctx.tracer.span
+    journal = ProvisionJournal(ctx)
+
+    with span("check_environment"):
+        utils.check_daemon(ctx.docker_client)
+        utils.check_lib(ctx)
+        if resume:
+            modules, docker_native = load_journal(journal, modules, docker_native)
+        else:
+            modules = append_running_modules(modules)
+        check_compatibility(modules)
 
     if not modules:
         ctx.logger.log(
@@ -92,30 +167,160 @@ def cli(ctx, modules, no_rollback, docker_native):
                     f"in the Minipresto library at {ctx.minipresto_lib_dir}"
                 )
 
+    # Skip provisioning entirely if nothing changed since the last successful
+    # provision
+    with span("check_fingerprint"):
+        fingerprint = compute_fingerprint(modules, docker_native)
+        up_to_date = not resume and check_fingerprint(
+            fingerprint, modules, clear=not plan
+        )
+    if up_to_date:
+        ctx.logger.log(
+            f"Environment is up to date (fingerprint {fingerprint[:12]}). "
+            f"Nothing to provision."
+        )
+        return
+
+    readiness = None
+    snapshot = None
     try:
+        if resume:
+            snapshot = dict(journal.get("snapshot"))
+            snapshot["volumes"] = set(snapshot["volumes"])
+        else:
+            snapshot = snapshot_resources()
         cmd_chunk = chunk(modules)
 
         # Module env variables shared with compose should be from the modules
         # section of environment variables and any extra variables provided by the
         # user that didn't fit into any other section
 
-        compose_env = ctx.env.get_section("MODULES")
+        compose_env = dict(ctx.env.get_section("MODULES"))
         compose_env.update(ctx.env.get_section("EXTRA"))
-        compose_cmd = build_command(docker_native, compose_env, cmd_chunk)
 
-        ctx.cmd_executor.execute_commands(compose_cmd, environment=compose_env)
-        initialize_containers()
+        if not journal.is_complete("compose_up"):
+            with span("plan_provision"):
+                provision_plan = plan_provision(compose_env, cmd_chunk)
+            log_plan(provision_plan, docker_native)
+            if plan:
+                return
+
+            journal.start(
+                modules,
+                docker_native,
+                snapshot={
+                    "containers": snapshot["containers"],
+                    "volumes": sorted(snapshot["volumes"]),
+                },
+            )
 
-        containers_to_restart = execute_bootstraps(modules)
-        containers_to_restart = append_user_config(containers_to_restart)
-        check_dup_configs()
-        restart_containers(containers_to_restart)
+            # Only services that are new or changed are brought up. Native
+            # Compose options may affect any service, so they bring up all
+            # services.
+            services = None
+            if provision_plan is not None and not docker_native:
+                services = get_planned_services(provision_plan)
+            if services is None or services:
+                compose_cmd = build_command(
+                    docker_native, compose_env, cmd_chunk, services
+                )
+                with span("docker-compose up"):
+                    ctx.cmd_executor.execute_commands(
+                        compose_cmd, environment=compose_env
+                    )
+            ctx.modules.invalidate_running_modules()
+            journal.complete("compose_up", services=services)
+
+        services = journal.get("services")
+        with span("initialize_containers"):
+            bootstrap_status = initialize_containers(services)
+        readiness = watch_readiness(modules)
+
+        if not journal.is_complete("execute_bootstraps"):
+            with span("execute_bootstraps"):
+                containers_to_restart = execute_bootstraps(
+                    modules, readiness, bootstrap_status
+                )
+            journal.complete(
+                "execute_bootstraps", containers_to_restart=containers_to_restart
+            )
+        if not journal.is_complete("append_user_config"):
+            with span("append_user_config"):
+                containers_to_restart = append_user_config(
+                    journal.get("containers_to_restart", []), readiness
+                )
+            journal.complete(
+                "append_user_config", containers_to_restart=containers_to_restart
+            )
+        containers_to_restart = journal.get("containers_to_restart", [])
+
+        with span("wait_for_readiness"):
+            readiness.wait()
+        if not journal.is_complete("check_dup_configs") and (
+            services is None or "presto" in services + containers_to_restart
+        ):
+            with span("check_dup_configs"):
+                check_dup_configs()
+            journal.complete("check_dup_configs")
+        if not journal.is_complete("restart_containers"):
+            with span("restart_containers"):
+                restart_containers(containers_to_restart, modules, readiness)
+            journal.complete("restart_containers")
+        readiness.summary()
+        record_fingerprint(fingerprint)
+        journal.clear()
         ctx.logger.log(f"Environment provisioning complete.")
 
     except Exception as e:
-        rollback_provision(no_rollback)
+        with span("rollback_provision"):
+            rollback_provision(no_rollback, snapshot)
+        if no_rollback and journal.has_progress():
+            ctx.logger.log(
+                f"To continue from the first incomplete provisioning phase once "
+                f"the error is fixed, run 'minipresto provision --resume'.",
+                level=ctx.logger.warn,
+            )
+        elif not no_rollback:
+            journal.clear()
         utils.handle_exception(e)
 
+    finally:
+        if readiness is not None:
+            readiness.close()
+
+
+@pass_environment
+def load_journal(ctx, journal=None, modules=[], docker_native=""):
+    """Loads the journal of a failed provision so that it can be resumed. A
+    user error is raised if there is no journal or if the given modules or
+    native Docker Compose options differ from the journaled provision.
+
+    Returns the journaled modules and native Docker Compose options."""
+
+    if not journal.load():
+        raise err.UserError(
+            f"No incomplete provision to resume.",
+            f"Provisions can only be resumed if they failed with '--no-rollback'.",
+        )
+    if modules and sorted(set(modules)) != sorted(set(journal.modules)):
+        raise err.UserError(
+            f"Modules {sorted(set(modules))} do not match the modules of the "
+            f"provision being resumed: {journal.modules}",
+            f"Run 'minipresto provision --resume' without '--module' options.",
+        )
+    if docker_native and docker_native != journal.docker_native:
+        raise err.UserError(
+            f"Native Docker Compose options '{docker_native}' do not match the "
+            f"options of the provision being resumed: '{journal.docker_native}'",
+            f"Run 'minipresto provision --resume' without '--docker-native'.",
+        )
+
+    ctx.logger.log(
+        f"Resuming provision of modules {journal.modules}...",
+        level=ctx.logger.verbose,
+    )
+    return journal.modules, journal.docker_native
+
 
 @pass_environment
 def append_running_modules(ctx, modules=[]):
@@ -164,6 +369,116 @@ def check_compatibility(ctx, modules=[]):
                 )
 
 
+@pass_environment
+def compute_fingerprint(ctx, modules=[], docker_native=""):
+    """Computes a fingerprint of every input to provisioning: the module set,
+    the contents of the modules' directories (Compose YAML, bootstrap scripts,
+    and resources), the library's root files and shared resources, all
+    environment variables (from `minipresto.cfg`, `minipresto.env`, and
+    `--env`), native Docker Compose options, and the CLI version (or the
+    library version if the CLI version can't be looked up).
+
+    Returns a SHA-256 hex digest."""
+
+    fingerprint = hashlib.sha256()
+
+    def update(*values):
+        for value in values:
+            if isinstance(value, str):
+                value = value.encode()
+            fingerprint.update(len(value).to_bytes(8, "big"))
+            fingerprint.update(value)
+
+    def update_dir(directory):
+        for root, dirs, filenames in os.walk(directory):
+            dirs.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(root, filename)
+                with open(path, "rb") as f:
+                    update(os.path.relpath(path, directory), f.read())
+
+    # The CLI version can't be looked up if the CLI isn't installed as a
+    # package; the library version is the closest stand-in
+    try:
+        version = utils.get_cli_ver()
+    except:
+        try:
+            version = utils.get_lib_ver(ctx.minipresto_lib_dir)
+        except:
+            version = "unknown"
+
+    update(version, docker_native)
+    for filename in SNAPSHOT_ROOT_FILES:
+        path = os.path.join(ctx.minipresto_lib_dir, filename)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                update(filename, f.read())
+    update_dir(os.path.join(ctx.minipresto_lib_dir, MODULE_ROOT, MODULE_RESOURCES))
+
+    for module in sorted(modules):
+        update(module)
+        update_dir(ctx.modules.data[module].module_dir)
+
+    for key, value, section, _ in sorted(ctx.env.items()):
+        update(section, key, str(value))
+
+    return fingerprint.hexdigest()
+
+
+@pass_environment
+def check_fingerprint(ctx, fingerprint="", modules=[], clear=True):
+    """Returns `True` if the Presto container holds the same provisioning
+    fingerprint, every Minipresto container is running, and every service of
+    the given modules has a container (e.g. one may have been removed with
+    `down --module`). Reading the fingerprint takes one API call; no commands
+    are executed in containers.
+
+    If the fingerprint does not match and `clear` is `True`, the stored
+    fingerprint is cleared, so an interrupted provision can't leave a stale
+    fingerprint behind."""
+
+    containers = ctx.docker_client.containers.list(
+        all=True, filters={"label": RESOURCE_LABEL}
+    )
+    presto = [c for c in containers if c.name == "presto"]
+    if not presto:
+        return False
+    presto = presto[0]
+
+    ctx.modules.load_yaml(modules)
+    expected = {"presto"}
+    for module in modules:
+        expected.update(ctx.modules.data[module].yaml_dict.get("services", {}))
+    existing = {c.labels.get(COMPOSE_SERVICE_LABEL) for c in containers}
+
+    running = all(c.status == "running" for c in containers)
+    running = running and expected <= existing
+    stored = ctx.container_files.read_file(presto, FINGERPRINT_FILE, "").strip()
+    if running and stored == fingerprint:
+        return True
+
+    if stored and clear and presto.status == "running":
+        clear_fingerprint(presto)
+    return False
+
+
+@pass_environment
+def record_fingerprint(ctx, fingerprint=""):
+    """Stores a provisioning fingerprint in the Presto container."""
+
+    presto = ctx.docker_client.containers.get("presto")
+    ctx.container_files.upload_files(presto, {FINGERPRINT_FILE: (fingerprint, 0o644)})
+
+
+@pass_environment
+def clear_fingerprint(ctx, presto=None):
+    """Clears the provisioning fingerprint stored in the Presto container, so
+    the next provision does not skip. Used when the environment is changed
+    outside of a provision."""
+
+    ctx.container_files.upload_files(presto, {FINGERPRINT_FILE: ("", 0o644)})
+
+
 @pass_environment
 def chunk(ctx, modules=[]):
     """Builds docker-compose command chunk for the chosen modules. Returns a
@@ -177,9 +492,99 @@ def chunk(ctx, modules=[]):
 
 
 @pass_environment
-def build_command(ctx, docker_native="", compose_env={}, chunk=""):
+def plan_provision(ctx, compose_env={}, chunk=""):
+    """Compares the environment's Compose services against existing containers.
+    A service's desired configuration is identified by the hash Docker Compose
+    computes for it (`docker-compose config --hash`), and is compared against
+    the `com.docker.compose.config-hash` label of the service's container.
+
+    Returns a dictionary of service names to actions: `create` (no container
+    exists), `recreate` (the configuration changed), `start` (the container is
+    stopped), or `unchanged`. Returns `None` if the Compose configuration
+    hashes cannot be computed (e.g. older Docker Compose versions)."""
+
+    hash_cmd = build_command("", compose_env, chunk, subcommand="config --hash='*'")
+    output = ctx.cmd_executor.execute_commands(
+        hash_cmd, environment=compose_env, suppress_output=True, trigger_error=False
+    )[0]
+    if output.get("return_code") != 0:
+        return None
+
+    desired_hashes = {}
+    for line in output.get("output", "").strip().splitlines():
+        line = line.split()
+        if len(line) == 2:
+            desired_hashes[line[0]] = line[1]
+
+    containers = ctx.docker_client.containers.list(
+        all=True, filters={"label": RESOURCE_LABEL}
+    )
+    existing = {c.labels.get(COMPOSE_SERVICE_LABEL): c for c in containers}
+
+    provision_plan = {}
+    for service, desired_hash in sorted(desired_hashes.items()):
+        container = existing.get(service)
+        if container is None:
+            provision_plan[service] = "create"
+        elif container.labels.get(COMPOSE_CONFIG_HASH_LABEL) != desired_hash:
+            provision_plan[service] = "recreate"
+        elif container.status != "running":
+            provision_plan[service] = "start"
+        else:
+            provision_plan[service] = "unchanged"
+    return provision_plan
+
+
+def get_planned_services(provision_plan={}):
+    """Returns the services in a provisioning plan that need to be brought up."""
+
+    return [
+        service for service, action in provision_plan.items() if action != "unchanged"
+    ]
+
+
+@pass_environment
+def log_plan(ctx, provision_plan=None, docker_native=""):
+    """Logs a provisioning plan (see `plan_provision()`). If services can't be
+    brought up incrementally, a warning saying why is logged instead."""
+
+    if provision_plan is None:
+        ctx.logger.log(
+            f"Incremental provisioning is unavailable: Docker Compose "
+            f"configuration hashes could not be computed (older Docker Compose "
+            f"versions do not support 'config --hash'). All services will be "
+            f"brought up.",
+            level=ctx.logger.warn,
+        )
+        return
+    if docker_native:
+        ctx.logger.log(
+            f"Incremental provisioning is unavailable with native Docker Compose "
+            f"options, as they may affect any service. All services will be "
+            f"brought up.",
+            level=ctx.logger.warn,
+        )
+        return
+    if not get_planned_services(provision_plan):
+        ctx.logger.log("All services are up to date.")
+        return
+
+    width = max(len(action) for action in provision_plan.values())
+    lines = ["Provisioning plan:"]
+    for service, action in provision_plan.items():
+        lines.append(f"  {action:<{width}}  {service}")
+    ctx.logger.log("\n".join(lines))
+
+
+@pass_environment
+def build_command(
+    ctx, docker_native="", compose_env={}, chunk="", services=None, subcommand="up -d"
+):
     """Builds a formatted docker-compose command for shell execution. Returns a
-    docker-compose command string."""
+    docker-compose command string.
+
+    If `services` are provided, only those services are brought up (with
+    `--no-deps`, so running dependencies are left alone)."""
 
     cmd = []
     compose_env_string = ""
@@ -194,7 +599,7 @@ def build_command(ctx, docker_native="", compose_env={}, chunk=""):
             os.path.join(ctx.minipresto_lib_dir, "docker-compose.yml"),
             " \\\n",
             chunk,  # Module YAML paths
-            "up -d",
+            subcommand,
         ]
     )
 
@@ -204,20 +609,60 @@ def build_command(ctx, docker_native="", compose_env={}, chunk=""):
             level=ctx.logger.verbose,
         )
         cmd.extend([" ", docker_native])
+    if services:
+        cmd.extend([" --no-deps ", " ".join(services)])
     return "".join(cmd)
 
 
 @pass_environment
-def execute_bootstraps(ctx, modules=[]):
+def watch_readiness(ctx, modules=[]):
+    """Starts checking the readiness of the Presto container and of each
+    container that declares readiness checks in its module's `metadata.json`
+    file. All containers are checked concurrently from the host.
+
+    Returns a `ReadinessMonitor` object."""
+
+    readiness = ReadinessMonitor(ctx)
+    readiness.watch("presto", get_presto_readiness())
+    for module in modules:
+        module_readiness = ctx.modules.data.get(module, {}).get("readiness", {})
+        for container_name, checks in module_readiness.items():
+            readiness.watch(container_name, checks)
+    return readiness
+
+
+@pass_environment
+def get_presto_readiness(ctx):
+    """Returns the readiness checks for the Presto container. The timeout is
+    set by the `PRESTO_READY_TIMEOUT` config."""
+
+    return {
+        "log_pattern": PRESTO_READY_PATTERN,
+        "timeout": ctx.env.get_int_var("PRESTO_READY_TIMEOUT", PRESTO_READY_TIMEOUT),
+    }
+
+
+@pass_environment
+def execute_bootstraps(ctx, modules=[], readiness=None, bootstrap_status={}):
     """Executes bootstrap script for each container that has one––bootstrap
     scripts will only execute once the container is fully running to prevent
     conflicts with procedures executing as part of the container's entrypoint.
     After each script executes, the relevant container is added to a restart
-    list.
+    list. Containers are bootstrapped concurrently, up to
+    `BOOTSTRAP_CONCURRENCY` at a time.
+
+    If a `ReadinessMonitor` is provided, each bootstrap script waits for the
+    container it executes in (other than Presto, which only needs to be
+    running), and for every container with readiness checks in the
+    bootstrap's module, to be ready. `bootstrap_status` holds the contents
+    of containers' bootstrap status files (see `initialize_containers()`), so
+    they do not have to be read again.
 
     Returns a list of containers names which had bootstrap scripts executed
     inside of them."""
 
+    ctx.modules.load_yaml(modules)
+
     services = []
     for module in modules:
         yaml_file = ctx.modules.data.get(module, {}).get("yaml_file", "")
@@ -230,10 +675,11 @@ def execute_bootstraps(ctx, modules=[]):
             )
         # Get all services defined in YAML file
         for service_key, service_dict in module_services.items():
-            services.append([service_key, service_dict, yaml_file])
+            services.append([service_key, service_dict, yaml_file, module])
 
-    containers = []
-    # Get all container names for each service
+    # Group bootstraps by container––a container's bootstraps execute in order,
+    # but separate containers are bootstrapped concurrently
+    container_bootstraps = {}
     for service in services:
         bootstrap = service[1].get("environment", {}).get("MINIPRESTO_BOOTSTRAP")
         if bootstrap is None:
@@ -243,79 +689,139 @@ def execute_bootstraps(ctx, modules=[]):
             # If there is not container name, the service name becomes the name
             # of the container
             container_name = service[0]
-        if execute_container_bootstrap(bootstrap, container_name, service[2]):
-            containers.append(container_name)
-    return containers
+        # Bootstraps in the Presto container only write config, which takes
+        # effect when Presto is restarted, so they don't wait for the server
+        dependencies = [] if container_name == "presto" else [container_name]
+        dependencies.extend(ctx.modules.data.get(service[3], {}).get("readiness", {}))
+        container_bootstraps.setdefault(container_name, []).append(
+            (bootstrap, service[2], service[3], dependencies)
+        )
+
+    max_workers = ctx.env.get_int_var("BOOTSTRAP_CONCURRENCY", BOOTSTRAP_CONCURRENCY)
+    results = utils.run_concurrently(
+        execute_container_bootstraps,
+        [
+            (k, v, readiness, bootstrap_status.get(k))
+            for k, v in container_bootstraps.items()
+        ],
+        max(1, max_workers),
+    )
+    return [
+        container_name
+        for container_name, executed in zip(container_bootstraps, results)
+        if executed
+    ]
 
 
 @pass_environment
-def execute_container_bootstrap(ctx, bootstrap="", container_name="", yaml_file=""):
-    """Executes a single bootstrap inside a container. If the
-    `/opt/minipresto/bootstrap_status.txt` file has the same checksum as the
-    bootstrap script that is about to be executed, the boostrap script is
-    skipped.
+def execute_container_bootstraps(
+    ctx, container_name="", bootstraps=[], readiness=None, status=None
+):
+    """Executes a container's bootstrap scripts in order. `bootstraps` is a
+    list of `(bootstrap, yaml_file, module, dependencies)` tuples, where
+    `dependencies` are the containers that must be ready before the script
+    executes. Scripts are uploaded to `/opt/minipresto/bootstrap/<module>/`, as
+    modules can ship scripts with the same name for the same container.
+
+    If the `/opt/minipresto/bootstrap_status.txt` file has the same checksum as
+    a bootstrap script, the script is skipped. Scripts that need to execute are
+    uploaded to the container, along with the library's shared module
+    resources, in a single tar stream. If the contents of the status file are
+    already known, they can be passed as `status`.
+
+    Returns `True` if any of the scripts are executed."""
+
+    if not container_name:
+        raise utils.handle_missing_param(["container_name"])
 
-    Returns `False` if the script is not executed and `True` if it is."""
+    container = ctx.docker_client.containers.get(container_name)
+    if status is None:
+        status = ctx.container_files.read_file(container, BOOTSTRAP_STATUS_FILE, "")
+
+    pending = []
+    for bootstrap, yaml_file, module, dependencies in bootstraps:
+        bootstrap_file = get_bootstrap_file(bootstrap, yaml_file)
+        with open(bootstrap_file, "rb") as f:
+            content = f.read()
+        checksum = hashlib.md5(content).hexdigest()
+        if checksum in status:
+            ctx.logger.log(
+                f"Bootstrap already executed in container '{container_name}'. Skipping.",
+                level=ctx.logger.verbose,
+            )
+            continue
+        pending.append(
+            (f"{BOOTSTRAP_DIR}/{module}/{bootstrap}", content, checksum, dependencies)
+        )
 
-    if any((not bootstrap, not container_name, not yaml_file)):
-        raise utils.handle_missing_param(list(locals().keys()))
+    if not pending:
+        return False
 
-    bootstrap_file = os.path.join(
-        os.path.dirname(yaml_file), "resources", "bootstrap", bootstrap
-    )
-    if not os.path.isfile(bootstrap_file):
-        raise err.UserError(
-            f"Bootstrap file does not exist at location: {bootstrap_file}",
-            "Check this module in the library to ensure the bootstrap script is present.",
-        )
+    files = get_module_resources()
+    for path, content, _, _ in pending:
+        files[path] = (content, 0o755)
+    ctx.container_files.upload_files(container, files)
 
-    # Add executable permissions to bootstrap
-    st = os.stat(bootstrap_file)
-    os.chmod(
-        bootstrap_file,
-        st.st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH,
-    )
+    for path, _, checksum, dependencies in pending:
+        if readiness is not None:
+            readiness.wait(dependencies)
 
-    bootstrap_checksum = hashlib.md5(open(bootstrap_file, "rb").read()).hexdigest()
-    container = ctx.docker_client.containers.get(container_name)
+        ctx.logger.log(
+            f"Executing bootstrap script in container '{container_name}'...",
+            level=ctx.logger.verbose,
+        )
 
-    # Check if this script has already been executed
-    output = ctx.cmd_executor.execute_commands(
-        "cat /opt/minipresto/bootstrap_status.txt",
-        suppress_output=True,
-        container=container,
-        trigger_error=False,
-    )
+        # Record the executed file's checksum in the same exec as the script
+        ctx.cmd_executor.execute_commands(
+            f"bash -c '{path} && echo {checksum} >> {BOOTSTRAP_STATUS_FILE}'",
+            container=container,
+            output_prefix=container_name,
+        )
 
-    if f"{bootstrap_checksum}" in output[0].get("output", ""):
         ctx.logger.log(
-            f"Bootstrap already executed in container '{container_name}'. Skipping.",
+            f"Successfully executed bootstrap script in container '{container_name}'.",
             level=ctx.logger.verbose,
         )
-        return False
 
-    ctx.logger.log(
-        f"Executing bootstrap script in container '{container_name}'...",
-        level=ctx.logger.verbose,
-    )
+    return True
 
-    ctx.cmd_executor.execute_commands(
-        f"docker cp {bootstrap_file} {container_name}:/tmp/"
-    )
 
-    # Record executed file checksum
-    ctx.cmd_executor.execute_commands(
-        f"/tmp/{os.path.basename(bootstrap_file)}",
-        f'bash -c "echo {bootstrap_checksum} >> /opt/minipresto/bootstrap_status.txt"',
-        container=container,
-    )
+@pass_environment
+def get_bootstrap_file(ctx, bootstrap="", yaml_file=""):
+    """Returns the path of a module's bootstrap script in the library. Raises a
+    user error if the script does not exist."""
 
-    ctx.logger.log(
-        f"Successfully executed bootstrap script in container '{container_name}'.",
-        level=ctx.logger.verbose,
+    if any((not bootstrap, not yaml_file)):
+        raise utils.handle_missing_param(list(locals().keys()))
+
+    bootstrap_file = os.path.join(
+        os.path.dirname(yaml_file), MODULE_RESOURCES, "bootstrap", bootstrap
     )
+    if not os.path.isfile(bootstrap_file):
+        raise err.UserError(
+            f"Bootstrap file does not exist at location: {bootstrap_file}",
+            "Check this module in the library to ensure the bootstrap script is present.",
+        )
+    return bootstrap_file
 
-    return True
+
+@pass_environment
+def get_module_resources(ctx):
+    """Returns the library's shared module resources (e.g. `wait-for-it.sh`) as
+    a dictionary of container paths (under `/opt/minipresto/resources/`) to
+    `(content, mode)` tuples."""
+
+    resources_dir = os.path.join(ctx.minipresto_lib_dir, MODULE_ROOT, MODULE_RESOURCES)
+    resources = {}
+    if not os.path.isdir(resources_dir):
+        return resources
+    for root, _, filenames in os.walk(resources_dir):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            relpath = os.path.relpath(path, resources_dir).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                resources[f"{RESOURCES_DIR}/{relpath}"] = (f.read(), 0o755)
+    return resources
 
 
 @pass_environment
@@ -335,13 +841,7 @@ def check_dup_configs(ctx):
             level=ctx.logger.verbose,
         )
         container = ctx.docker_client.containers.get("presto")
-        output = ctx.cmd_executor.execute_commands(
-            f"cat {ETC_PRESTO}/{check_file}",
-            suppress_output=True,
-            container=container,
-        )
-
-        configs = output[0].get("output", "")
+        configs = ctx.container_files.read_file(container, f"{ETC_PRESTO}/{check_file}")
         if not configs:
             raise err.MiniprestoError(
                 f"Presto {check_file} file unable to be read from Presto container."
@@ -399,7 +899,7 @@ def check_dup_configs(ctx):
 
 
 @pass_environment
-def append_user_config(ctx, containers_to_restart=[]):
+def append_user_config(ctx, containers_to_restart=[], readiness=None):
     """Appends Presto config from minipresto.cfg file. If the config is not
     present, it is added. If it exists, it is replaced. If anything changes in
     the Presto config, the Presto container is added to the restart list if it's
@@ -432,41 +932,34 @@ def append_user_config(ctx, containers_to_restart=[]):
         "Checking Presto server status before updating configs...",
         level=ctx.logger.verbose,
     )
-    retry = 0
-    while retry <= 30:
-        logs = presto_container.logs().decode()
-        if "======== SERVER STARTED ========" in logs:
-            break
-        elif presto_container.status != "running":
-            raise err.MiniprestoError(
-                f"Presto container stopped running. Inspect the container logs if the "
-                f"container is still available. If the container was rolled back, rerun "
-                f"the command with the '--no-rollback' option, then inspect the logs."
-            )
-        else:
-            ctx.logger.log(
-                "Presto server has not started. Waiting one second and trying again...",
-                level=ctx.logger.verbose,
-            )
-            time.sleep(1)
-            retry += 1
+    if readiness is None:
+        readiness = ReadinessMonitor(ctx)
+        readiness.watch("presto", get_presto_readiness())
+        try:
+            readiness.wait(["presto"])
+        finally:
+            readiness.close()
+    else:
+        readiness.wait(["presto"])
 
-    current_configs = ctx.cmd_executor.execute_commands(
-        f"cat {ETC_PRESTO}/{PRESTO_CONFIG}",
-        f"cat {ETC_PRESTO}/{PRESTO_JVM_CONFIG}",
-        container=presto_container,
-        suppress_output=True,
+    current_presto_config = ctx.container_files.read_file(
+        presto_container, f"{ETC_PRESTO}/{PRESTO_CONFIG}", ""
+    )
+    current_jvm_config = ctx.container_files.read_file(
+        presto_container, f"{ETC_PRESTO}/{PRESTO_JVM_CONFIG}", ""
     )
 
-    current_presto_config = current_configs[0].get("output", "").strip().split("\n")
-    current_jvm_config = current_configs[1].get("output", "").strip().split("\n")
+    current_presto_config = current_presto_config.strip().split("\n")
+    current_jvm_config = current_jvm_config.strip().split("\n")
 
-    def append_configs(user_configs, current_configs, filename):
+    def merge_configs(user_configs, current_configs, filename):
 
         # If there is an overlapping config key, replace it with the user
         # config. If there is not overlapping config key, append it to the
         # current config list.
 
+        current_configs = list(current_configs)
+
         if filename == PRESTO_CONFIG:
             for user_config in user_configs:
                 user_config = utils.parse_key_value_pair(
@@ -510,81 +1003,236 @@ def append_user_config(ctx, containers_to_restart=[]):
                     ):
                         current_configs.append(user_config)
 
-        # Replace existing file with new values
-        ctx.cmd_executor.execute_commands(
-            f"rm {ETC_PRESTO}/{filename}", container=presto_container
-        )
-
-        for current_config in current_configs:
-            append_config = (
-                f'bash -c "cat <<EOT >> {ETC_PRESTO}/{filename}\n{current_config}\nEOT"'
+        return current_configs
+
+    # Only write files (and restart Presto) if the merged config differs from
+    # what is already in the container
+    changed = False
+    for user_configs, current_configs, filename in (
+        (user_presto_config, current_presto_config, PRESTO_CONFIG),
+        (user_jvm_config, current_jvm_config, PRESTO_JVM_CONFIG),
+    ):
+        desired_configs = merge_configs(user_configs, current_configs, filename)
+        current_hash = hashlib.sha256("\n".join(current_configs).encode()).hexdigest()
+        desired_hash = hashlib.sha256("\n".join(desired_configs).encode()).hexdigest()
+        if current_hash == desired_hash:
+            ctx.logger.log(
+                f"Presto {filename} is unchanged (SHA-256 {current_hash[:12]}).",
+                level=ctx.logger.verbose,
             )
-            ctx.cmd_executor.execute_commands(append_config, container=presto_container)
+            continue
 
-    append_configs(user_presto_config, current_presto_config, PRESTO_CONFIG)
-    append_configs(user_jvm_config, current_jvm_config, PRESTO_JVM_CONFIG)
+        differences = diff_configs(current_configs, desired_configs, filename)
+        ctx.logger.log(
+            f"Presto {filename} changed ({', '.join(differences)}). Updating file..."
+        )
+        ctx.container_files.write_file(
+            presto_container,
+            f"{ETC_PRESTO}/{filename}",
+            "\n".join(desired_configs) + "\n",
+        )
+        changed = True
 
-    if not "presto" in containers_to_restart:
+    if changed and not "presto" in containers_to_restart:
         containers_to_restart.append("presto")
 
     return containers_to_restart
 
 
+def diff_configs(current_configs=[], desired_configs=[], filename=""):
+    """Returns a list describing the differences between two versions of a
+    Presto config file. For `config.properties`, the keys that were added,
+    removed, or changed are listed; for `jvm.config`, the lines that were added
+    or removed are listed."""
+
+    def parse(configs):
+        parsed = {}
+        for config in configs:
+            if config.startswith("#"):
+                continue
+            config = utils.parse_key_value_pair(config, err_type=err.UserError)
+            if config is not None:
+                parsed[config[0]] = config[1]
+        return parsed
+
+    if filename == PRESTO_CONFIG:
+        current, desired = parse(current_configs), parse(desired_configs)
+        differences = [f"+{k}" for k in desired if k not in current]
+        differences.extend(f"-{k}" for k in current if k not in desired)
+        differences.extend(
+            f"~{k}" for k in desired if k in current and desired[k] != current[k]
+        )
+    else:
+        current, desired = set(current_configs), set(desired_configs)
+        differences = [f"+{c}" for c in desired_configs if c not in current]
+        differences.extend(f"-{c}" for c in current_configs if c not in desired)
+
+    # Changes that don't alter any key (e.g. reordered lines) are still changes
+    return differences or ["reordered or reformatted lines"]
+
+
 @pass_environment
-def restart_containers(ctx, containers_to_restart=[]):
-    """Restarts all the containers in the list."""
+def restart_containers(ctx, containers_to_restart=[], modules=[], readiness=None):
+    """Restarts all the containers in the list. Containers are restarted in
+    waves ordered by the `depends_on` relationships in the modules' Compose
+    files: a container is restarted after the containers it depends on, and
+    containers in the same wave are restarted concurrently. If a
+    `ReadinessMonitor` is provided, each wave's readiness checks must pass
+    before the next wave is restarted."""
 
     if containers_to_restart == []:
         return
 
-    # Remove any duplicates
-    containers_to_restart = list(set(containers_to_restart))
+    stop_timeout = ctx.env.get_int_var("STOP_GRACE_PERIOD", STOP_GRACE_PERIOD)
+    max_workers = ctx.env.get_int_var("DOCKER_POOL_SIZE", DOCKER_POOL_SIZE)
+    waves = get_restart_waves(containers_to_restart, get_dependencies(modules))
 
-    for container in containers_to_restart:
-        try:
-            container = ctx.docker_client.containers.get(container)
-            ctx.logger.log(
-                f"Restarting container '{container.name}'...", level=ctx.logger.verbose
-            )
-            container.restart()
-        except NotFound:
-            raise err.MiniprestoError(
-                f"Attempting to restart container '{container.name}', but the container was not found."
+    for wave in waves:
+        utils.run_concurrently(
+            restart_container,
+            [(container_name, stop_timeout) for container_name in wave],
+            max_workers,
+        )
+        if readiness is not None:
+            for container_name in wave:
+                readiness.rewatch(container_name)
+            readiness.wait(wave)
+
+
+@pass_environment
+def restart_container(ctx, container_name="", stop_timeout=STOP_GRACE_PERIOD):
+    """Restarts a single container, giving it `stop_timeout` seconds to stop
+    before it is killed."""
+
+    try:
+        container = ctx.docker_client.containers.get(container_name)
+    except NotFound:
+        raise err.MiniprestoError(
+            f"Attempting to restart container '{container_name}', but the container was not found."
+        )
+    ctx.logger.log(
+        f"Restarting container '{container.name}'...", level=ctx.logger.verbose
+    )
+    container.restart(timeout=stop_timeout)
+    ctx.cmd_executor.invalidate_container(container)
+
+
+@pass_environment
+def get_dependencies(ctx, modules=[]):
+    """Returns a dictionary of container names to the set of container names
+    they depend on, per the `depends_on` sections of the given modules'
+    Compose files."""
+
+    dependencies = {}
+    for module in modules:
+        services = ctx.modules.data.get(module, {}).get("yaml_dict", {}).get("services")
+        services = services or {}
+
+        def container_name(service_key):
+            service_dict = services.get(service_key) or {}
+            return service_dict.get("container_name", service_key)
+
+        for service_key, service_dict in services.items():
+            depends_on = (service_dict or {}).get("depends_on") or []
+            dependencies.setdefault(container_name(service_key), set()).update(
+                container_name(dependency) for dependency in depends_on
             )
+    return dependencies
+
+
+def get_restart_waves(containers=[], dependencies={}):
+    """Groups containers into waves such that every container comes after the
+    containers it (transitively) depends on. Dependencies that are not being
+    restarted are ignored.
+
+    Returns a list of sorted lists of container names."""
+
+    remaining = set(containers)
+    waves = []
+    while remaining:
+        wave = sorted(
+            c for c in remaining if not (dependencies.get(c, set()) & remaining)
+        )
+        if not wave:
+            # Circular dependencies; restart the rest together
+            wave = sorted(remaining)
+        waves.append(wave)
+        remaining.difference_update(wave)
+    return waves
 
 
 @pass_environment
-def initialize_containers(ctx):
-    """Initializes each container with /opt/minipresto/bootstrap_status.txt."""
+def initialize_containers(ctx, services=None):
+    """Initializes each container with /opt/minipresto/bootstrap_status.txt.
+    Containers are initialized concurrently with a single idempotent exec each,
+    which also reads the status file. If `services` is provided, only the
+    containers of those Compose services are initialized.
+
+    Returns a dictionary of container names to the contents of their bootstrap
+    status files."""
 
     containers = ctx.docker_client.containers.list(filters={"label": RESOURCE_LABEL})
-    for container in containers:
-        output = ctx.cmd_executor.execute_commands(
-            "cat /opt/minipresto/bootstrap_status.txt",
-            suppress_output=True,
-            container=container,
-            trigger_error=False,
+    if services is not None:
+        containers = [
+            c for c in containers if c.labels.get(COMPOSE_SERVICE_LABEL) in services
+        ]
+    max_workers = ctx.env.get_int_var("DOCKER_POOL_SIZE", DOCKER_POOL_SIZE)
+    statuses = utils.run_concurrently(
+        initialize_container, [(container,) for container in containers], max_workers
+    )
+    return {container.name: status for container, status in zip(containers, statuses)}
+
+
+@pass_environment
+def initialize_container(ctx, container=None):
+    """Creates the bootstrap status file in a container if it does not exist
+    and returns its contents."""
+
+    status_dir = os.path.dirname(BOOTSTRAP_STATUS_FILE)
+    output = ctx.cmd_executor.execute_commands(
+        f"sh -c 'mkdir -p {status_dir} && touch {BOOTSTRAP_STATUS_FILE} && "
+        f"cat {BOOTSTRAP_STATUS_FILE}'",
+        suppress_output=True,
+        container=container,
+        trigger_error=False,
+    )
+    if output[0].get("return_code", None) != 0:
+        raise err.MiniprestoError(
+            f"Command failed.\n"
+            f"Output: {output[0].get('output', '').strip()}\n"
+            f"Exit code: {output[0].get('return_code', None)}"
         )
-        output_string = output[0].get("output", "").strip()
-        if "no such file or directory" in output_string.lower():
-            ctx.cmd_executor.execute_commands(
-                "mkdir -p /opt/minipresto/",
-                "touch /opt/minipresto/bootstrap_status.txt",
-                container=container,
-            )
-        elif output[0].get("return_code", None) == 0:
-            continue
-        else:
-            raise err.MiniprestoError(
-                f"Command failed.\n"
-                f"Output: {output_string}\n"
-                f"Exit code: {output[0].get('return_code', None)}"
-            )
+    return output[0].get("output", "")
+
+
+@pass_environment
+def snapshot_resources(ctx):
+    """Records the Minipresto containers and volumes that exist before the
+    environment is changed, so that a rollback can tell which resources the
+    provision created.
+
+    Returns a dictionary with `containers` (container IDs to statuses) and
+    `volumes` (a set of volume names)."""
+
+    containers = ctx.docker_client.containers.list(
+        filters={"label": RESOURCE_LABEL}, all=True
+    )
+    volumes = ctx.docker_client.volumes.list(filters={"label": RESOURCE_LABEL})
+    return {
+        "containers": {container.id: container.status for container in containers},
+        "volumes": {volume.name for volume in volumes},
+    }
 
 
 @pass_environment
-def rollback_provision(ctx, no_rollback):
-    """Rolls back the provisioning command in the event of an error."""
+def rollback_provision(ctx, no_rollback=False, snapshot=None):
+    """Rolls back the provisioning command in the event of an error. Only the
+    changes made by the failed provision are undone: containers it created
+    (or recreated) are removed, containers it started are stopped, and volumes
+    it created are removed. Containers and volumes that existed before the
+    provision (per `snapshot`, see `snapshot_resources()`) are left alone.
+    Containers that were recreated cannot be restored to their previous
+    state."""
 
     if no_rollback:
         ctx.logger.log(
@@ -593,6 +1241,13 @@ def rollback_provision(ctx, no_rollback):
             level=ctx.logger.warn,
         )
         return
+    if snapshot is None:
+        ctx.logger.log(
+            f"Errors occurred before any resources were provisioned. Nothing to "
+            f"roll back.",
+            level=ctx.logger.warn,
+        )
+        return
     ctx.logger.log(
         f"Rolling back provisioned resources due to "
         f"errors encountered while provisioning the environment.",
@@ -602,7 +1257,34 @@ def rollback_provision(ctx, no_rollback):
     containers = ctx.docker_client.containers.list(
         filters={"label": RESOURCE_LABEL}, all=True
     )
+    previous = snapshot["containers"]
+    created = [c for c in containers if c.id not in previous]
+    started = [
+        c
+        for c in containers
+        if c.id in previous and previous[c.id] != "running" and c.status == "running"
+    ]
+
+    stop_timeout = ctx.env.get_int_var("STOP_GRACE_PERIOD", STOP_GRACE_PERIOD)
+    utils.teardown_containers(ctx, created, stop_timeout)
+    utils.teardown_containers(ctx, started, stop_timeout, remove=False)
+    ctx.modules.invalidate_running_modules()
+
+    volumes = ctx.docker_client.volumes.list(filters={"label": RESOURCE_LABEL})
+    for volume in volumes:
+        if volume.name in snapshot["volumes"]:
+            continue
+        try:
+            volume.remove()
+        except APIError as e:
+            ctx.logger.log(
+                f"Failed to remove volume '{volume.name}': {e}", level=ctx.logger.warn
+            )
+            continue
+        ctx.logger.log(f"Removed volume: {volume.name}", level=ctx.logger.verbose)
 
-    for container in containers:
-        container.stop()
-        container.remove()
+    ctx.logger.log(
+        f"Rolled back {len(created)} created and {len(started)} started "
+        f"container(s). Other containers were left unchanged.",
+        level=ctx.logger.warn,
+    )
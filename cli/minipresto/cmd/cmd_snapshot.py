@@ -332,15 +332,23 @@ def scrub_config_file(ctx, snapshot_name_dir):
 def scrub_line(ctx, line):
     """Scrubs a line from a snapshot config file. Returns the scrubbed line."""
 
-    # If the key has a substring that matches any of the scrub keys, we know
-    # it's an item whose value needs to be scrubbed
     line = utils.parse_key_value_pair(line, err_type=err.UserError)
-    if any(item in line[0].lower() for item in SCRUB_KEYS):
-        line[1] = "*" * 20
+    line[1] = scrub_value(line[0], line[1])
 
     return "=".join(line)
 
 
+def scrub_value(key="", value=""):
+    """Returns the value scrubbed if the key marks it as sensitive data.
+    Otherwise, returns the value unchanged."""
+
+    # If the key has a substring that matches any of the scrub keys, we know
+    # it's an item whose value needs to be scrubbed
+    if any(item in key.lower() for item in SCRUB_KEYS):
+        return "*" * 20
+    return value
+
+
 @pass_environment
 def copy_module_dirs(ctx, snapshot_name_dir, modules=[]):
     """Copies module directories into the named snapshot directory."""
@@ -1,15 +1,32 @@
 #!usr/bin/env/python3
 # -*- coding: utf-8 -*-
 
+import io
 import os
 import json
 import re
+import time
 import yaml
+import codecs
 import docker
+import random
+import socket
+import tarfile
+import tempfile
+import threading
 import subprocess
+import urllib.error
+import urllib.request
+import http.client as http_client
 
 from pathlib import Path
+from docker.errors import NotFound
+from docker.errors import APIError
+from urllib.parse import urlparse
 from configparser import ConfigParser
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from minipresto import utils
 from minipresto import errors as err
@@ -18,6 +35,30 @@ from minipresto.settings import MODULE_LABEL_KEY_ROOT
 from minipresto.settings import MODULE_ROOT
 from minipresto.settings import MODULE_SECURITY
 from minipresto.settings import MODULE_CATALOG
+from minipresto.settings import MODULE_CACHE_FILE
+from minipresto.settings import MODULE_CACHE_VERSION
+from minipresto.settings import MODULE_PARSE_PARALLEL_THRESHOLD
+from minipresto.settings import STATE_DIR
+from minipresto.settings import PROVISION_JOURNAL_FILE
+from minipresto.settings import DOCKER_POOL_SIZE
+from minipresto.settings import DOCKER_TIMEOUT
+from minipresto.settings import OUTPUT_SPILL_THRESHOLD
+from minipresto.settings import OUTPUT_READ_SIZE
+from minipresto.settings import OUTPUT_BATCH_SIZE
+from minipresto.settings import READINESS_TIMEOUT
+from minipresto.settings import READINESS_CONCURRENCY
+from minipresto.settings import READINESS_INITIAL_DELAY
+from minipresto.settings import READINESS_MAX_DELAY
+from minipresto.settings import READINESS_PROBE_TIMEOUT
+
+ANSI_REGEX = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+ANSI_BYTES_REGEX = re.compile(ANSI_REGEX.pattern.encode())
+
+# Use libyaml's C loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
 
 class Environment:
@@ -27,14 +68,18 @@ class Environment:
 
     ### Public Attributes (Interactive)
     - `logger`: A `minipresto.utils.Logger` object.
+    - `tracer`: A `minipresto.utils.Tracer` object that records timed spans of
+      work, including every Docker API request.
     - `env`: An `EnvironmentVariables` object containing all CLI environment
         variables, subdivided by sections when possible.
     - `modules`: A `Modules` object containing metadata about Minipresto
-      modules.
+      modules. Loaded on first access.
     - `cmd_executor`: A `CommandExecutor` object to execute shell commands in
       the host shell and inside containers.
-    - `docker_client`: A `docker.DockerClient` object.
-    - `api_client`: A `docker.APIClient` object.
+    - `container_files`: A `ContainerFiles` object to read and write files
+      inside containers.
+    - `docker_client`: A `docker.DockerClient` object. Created on first access.
+    - `api_client`: A `docker.APIClient` object. Created on first access.
 
     ### Public Attributes (Static)
     - `verbose`: If `True`, logs flagged as verbose to are sent to stdout.
@@ -55,11 +100,18 @@ class Environment:
         self._user_env = []
 
         self.logger = utils.Logger()
+        self.tracer = utils.Tracer()
         self.env = EnvironmentVariables
-        self.modules = Modules
         self.cmd_executor = CommandExecutor
-        self.docker_client = docker.DockerClient
-        self.api_client = docker.APIClient
+        self.container_files = ContainerFiles
+
+        # Attributes that are expensive to build and are only built the first
+        # time they are accessed (see the `modules`, `docker_client`, and
+        # `api_client` properties)
+        self._modules = None
+        self._docker_client = None
+        self._api_client = None
+        self._docker_clients_set = False
 
         # Paths
         self.user_home_dir = os.path.expanduser("~")
@@ -115,7 +167,7 @@ class Environment:
         return lib_dir
 
     @utils.exception_handler
-    def _user_init(self, verbose=False, user_env=[]):
+    def _user_init(self, verbose=False, user_env=[], log_file=None):
         """Initialize attributes that depend on user-provided input."""
 
         # Update static attributes
@@ -123,7 +175,7 @@ class Environment:
         self._user_env = user_env
 
         # Instantiate/update interactive attributes
-        self.logger = utils.Logger(self.verbose)
+        self.logger = utils.Logger(self.verbose, log_file)
         self.env = EnvironmentVariables(self)
 
         # Skip the library-related procedures if the library is not found
@@ -135,27 +187,61 @@ class Environment:
                 )
 
             # Now that we know where the library is, we can try to parse the env
-            # file and obtain all of the modules
+            # file. Modules are loaded when they are first accessed.
             self.env._parse_library_env()
-            self.modules = Modules(self)
-
-            # Warn the user if the library and CLI vers don't match
-            cli_ver = utils.get_cli_ver()
-            lib_ver = utils.get_lib_ver(self.minipresto_lib_dir)
-            if cli_ver != lib_ver:
-                self.logger.log(
-                    f"CLI version {cli_ver} and library version {lib_ver} "
-                    f"do not match. You can update the Minipresto library "
-                    f"version to match the CLI version by running 'minipresto "
-                    f"lib_install'.",
-                    level=self.logger.warn,
-                )
         except:
             pass
 
         self.env._log_env_vars()
         self.cmd_executor = CommandExecutor(self)
-        self._get_docker_clients()
+        self.container_files = ContainerFiles(self)
+
+    @property
+    def modules(self):
+        """A `Modules` object. The library's modules are loaded (and the
+        library version is checked against the CLI version) the first time this
+        attribute is accessed."""
+
+        if self._modules is None:
+            self._modules = Modules(self)
+            self._check_lib_ver()
+        return self._modules
+
+    @property
+    def docker_client(self):
+        """A `docker.DockerClient` object, created the first time this
+        attribute is accessed. `None` if the client could not be created."""
+
+        if not self._docker_clients_set:
+            self._get_docker_clients()
+        return self._docker_client
+
+    @property
+    def api_client(self):
+        """A `docker.APIClient` object, created the first time this attribute
+        is accessed. `None` if the client could not be created."""
+
+        if not self._docker_clients_set:
+            self._get_docker_clients()
+        return self._api_client
+
+    def _check_lib_ver(self):
+        """Warns the user if the library and CLI versions don't match."""
+
+        try:
+            cli_ver = utils.get_cli_ver()
+            lib_ver = utils.get_lib_ver(self.minipresto_lib_dir)
+        except:
+            return
+
+        if cli_ver != lib_ver:
+            self.logger.log(
+                f"CLI version {cli_ver} and library version {lib_ver} "
+                f"do not match. You can update the Minipresto library "
+                f"version to match the CLI version by running 'minipresto "
+                f"lib_install'.",
+                level=self.logger.warn,
+            )
 
     def _handle_minipresto_user_dir(self):
         """Checks if a Minipresto directory exists in the user home directory.
@@ -186,25 +272,47 @@ class Environment:
     def _get_docker_clients(self):
         """Gets DockerClient and APIClient objects. References the DOCKER_HOST
         variable in `minipresto.cfg` and uses for clients if present. Returns a
-        tuple of DockerClient and APIClient objects, respectiveley.
+        tuple of DockerClient and APIClient objects, respectiveley. Both share
+        a single HTTP connection pool configured by the `DOCKER_POOL_SIZE`,
+        `DOCKER_TIMEOUT`, and `DOCKER_KEEP_ALIVE` variables.
+
+        If there is an error fetching the clients, None types will be set and
+        returned for each client. The lack of clients should be caught by
+        check_daemon() calls that execute in each command that requires an
+        accessible Docker service."""
+
+        self._docker_clients_set = True
 
-        If there is an error fetching the clients, None types will be returned
-        for each client. The lack of clients should be caught by check_daemon()
-        calls that execute in each command that requires an accessible Docker
-        service."""
+        # Both clients share a single connection pool: the DockerClient's
+        # underlying APIClient is used as the APIClient
+        docker_host = self.env.get_var("DOCKER_HOST", "")
+        pool_size = self.env.get_int_var("DOCKER_POOL_SIZE", DOCKER_POOL_SIZE)
+        timeout = self.env.get_int_var("DOCKER_TIMEOUT", DOCKER_TIMEOUT)
+        keep_alive = self.env.get_var("DOCKER_KEEP_ALIVE", "")
 
         try:
-            docker_host = self.env.get_var("DOCKER_HOST", "")
-            docker_client = docker.DockerClient(base_url=docker_host)
-            api_client = docker.APIClient(base_url=docker_host)
-            self.docker_client, self.api_client = docker_client, api_client
+            docker_client = docker.DockerClient(
+                base_url=docker_host or None,
+                timeout=timeout,
+                max_pool_size=pool_size,
+            )
+            if keep_alive.strip().lower() in ("false", "no", "n", "0"):
+                docker_client.api.headers["Connection"] = "close"
+            self.tracer.instrument_docker(docker_client.api)
+            self._docker_client, self._api_client = docker_client, docker_client.api
         except:
-            return None, None
+            self._docker_client, self._api_client = None, None
+        return self._docker_client, self._api_client
 
 
 class EnvironmentVariables:
     """Gathers all Minipresto variables into a single source of truth.
 
+    Variables are kept in sections (mirroring the `minipresto.cfg` sections)
+    and in a flat index keyed by the upper-cased variable name, so lookups are
+    case-insensitive and constant-time. The index also records where each
+    variable came from.
+
     ### Parameters
     - `ctx`: Instantiated Environment object (with user input already accounted
       for).
@@ -214,13 +322,18 @@ class EnvironmentVariables:
 
     ### Public Methods
     - `get_var()`: Gets an environment variable from a specific section and key.
+    - `get_int_var()`: Gets an environment variable as an integer.
     - `get_section()`: Gets a a section from the environment variable dict.
+    - `get_source()`: Gets the source an environment variable was set from.
+    - `items()`: Returns all environment variables with their sections and
+      sources.
 
     ### Usage
     ```python
     # ctx object has an instantiated EnvironmentVariables object
     env_variable = ctx.env.get_var("STARBURST_VER", "338-e")
     env_section = ctx.env.get_section("MODULES")
+    env_source = ctx.env.get_source("STARBURST_VER")
     ```"""
 
     @utils.exception_handler
@@ -230,6 +343,7 @@ class EnvironmentVariables:
             raise utils.handle_missing_param(list(locals().keys()))
 
         self.env = {}
+        self._index = {}
         self._ctx = ctx
 
         self._parse_minipresto_config()
@@ -237,8 +351,51 @@ class EnvironmentVariables:
 
     def get_var(self, key="", default=None):
         """Gets and returns a variable from a section of the environment
-        variables. Since it is assumed there will not be duplicate environment
-        variables between sections, the first-match is returned.
+        variables. Keys are matched case-insensitively. Since it is assumed
+        there will not be duplicate environment variables between sections, the
+        first variable registered under a key is returned.
+
+        ### Parameters
+        - `key`: The key to search for.
+        - `default` The default value to return if the key is not found."""
+
+        if not key:
+            raise utils.handle_missing_param(["key"])
+
+        entry = self._index.get(key.upper())
+        if entry is None:
+            return default
+        section, var_key, _ = entry
+        return self.env.get(section, {}).get(var_key, default)
+
+    def get_int_var(self, key="", default=0):
+        """Gets and returns a variable as an integer. Returns the default if
+        the variable is not set or is empty. Raises a user error if the value
+        is not a non-negative integer.
+
+        ### Parameters
+        - `key`: The key to search for.
+        - `default` The default value to return if the key is not found."""
+
+        value = self.get_var(key, "")
+        if value is None or str(value).strip() == "":
+            return default
+        try:
+            value = int(str(value).strip())
+            if value < 0:
+                raise ValueError
+        except ValueError:
+            raise err.UserError(
+                f"Invalid value for environment variable '{key}': '{value}'. "
+                f"Expected a non-negative integer.",
+                f"Check the value in your 'minipresto.cfg' file or '--env' options.",
+            )
+        return value
+
+    def get_source(self, key="", default=None):
+        """Gets and returns the source of a variable, e.g. `--env`, the
+        `minipresto.cfg` section it was set in, or the library `minipresto.env`
+        file.
 
         ### Parameters
         - `key`: The key to search for.
@@ -247,12 +404,19 @@ class EnvironmentVariables:
         if not key:
             raise utils.handle_missing_param(["key"])
 
-        for section_k, section_v in self.env.items():
-            if isinstance(section_v, dict):
-                for section_dict_k, section_dict_v in section_v.items():
-                    if section_dict_k.upper() == key.upper():
-                        return section_dict_v
-        return default
+        entry = self._index.get(key.upper())
+        if entry is None:
+            return default
+        return entry[2]
+
+    def items(self):
+        """Returns a list of `(key, value, section, source)` tuples for all
+        environment variables, in the order they were registered."""
+
+        items = []
+        for section, key, source in self._index.values():
+            items.append((key, self.env[section][key], section, source))
+        return items
 
     def get_section(self, section=""):
         """Gets and returns a section from the environment variables. If the
@@ -266,6 +430,27 @@ class EnvironmentVariables:
 
         return self.env.get(section.upper(), {})
 
+    def _set_var(self, section="", key="", value="", source=""):
+        """Sets a variable in a section and indexes it. If the key is already
+        indexed (case-insensitively), the existing variable is overwritten in
+        its original section."""
+
+        entry = self._index.get(key.upper())
+        if entry is not None:
+            section, key, _ = entry
+        self.env.setdefault(section, {})[key] = value
+        self._index[key.upper()] = (section, key, source)
+
+    def _is_set(self, key=""):
+        """Returns `True` if the key is indexed with a non-empty value. Keys
+        with empty values do not block lower-precedence sources."""
+
+        entry = self._index.get(key.upper())
+        if entry is None:
+            return False
+        section, key, _ = entry
+        return bool(self.env.get(section, {}).get(key))
+
     def _parse_minipresto_config(self):
         """Parses the Minipresto config file and adds it to the env
         dictionary."""
@@ -281,13 +466,10 @@ class EnvironmentVariables:
             config.read(self._ctx.config_file)
             for section in config.sections():
                 for k, v in config.items(section):
-                    # Skip if the key exists in any section
-                    if self.get_var(k, False):
+                    # Skip if the key is set in any section
+                    if self._is_set(k):
                         continue
-                    # Account for empty section
-                    if not self.env.get(section, False):
-                        self.env[section] = {}
-                    self.env[section][k] = v
+                    self._set_var(section, k, v, f"{self._ctx.config_file} [{section}]")
         except Exception as e:
             utils.handle_exception(
                 e,
@@ -318,58 +500,22 @@ class EnvironmentVariables:
                 env_var = utils.parse_key_value_pair(env_var, err_type=err.UserError)
                 if env_var is None:
                     continue
-                # Skip if the key exists in any section
-                if self.get_var(env_var[0], False):
+                # Skip if the key is set in any section
+                if self._is_set(env_var[0]):
                     continue
-                self.env["MODULES"][env_var[0]] = env_var[1]
+                self._set_var("MODULES", env_var[0], env_var[1], env_file)
 
     def _parse_user_env(self):
-        """Parses user-provided environment variables for the current
-        command."""
+        """Parses user-provided environment variables for the current command.
+        If a variable's key matches an existing key, the user's `--env` value
+        overrides the original value. Any variable keys that do not match an
+        existing key are added to the section dict "EXTRA"."""
 
-        if not self._ctx._user_env:
-            return
-
-        user_env_dict = {}
         for env_var in self._ctx._user_env:
             env_var = utils.parse_key_value_pair(env_var, err_type=err.UserError)
-            user_env_dict[env_var[0]] = env_var[1]
-
-        # Loop through user-provided environment variables and check for matches
-        # in each section dict. If the variable key is in the section dict, it
-        # needs to be identified and replaced with the user's `--env` value,
-        # effectively overriding the original value.
-        #
-        # We build a new dict to prevent issues with changing dict size while
-        # iterating.
-        #
-        # Any variable keys that do not match with an existing key will be added
-        # to the section dict "EXTRA".
-
-        new_dict = {}
-        for section_k, section_v in self.env.items():
-            if not isinstance(section_v, dict):
-                raise err.MiniprestoError(
-                    f"Invalid environment dictionary. Expected nested dictionaries. "
-                    f"Received dictionary:\n"
-                    f"{json.dumps(self.env, indent=2)}"
-                )
-            delete_keys = []
-            for user_k, user_v in user_env_dict.items():
-                if user_k in section_v:
-                    if new_dict.get(section_k, None) is None:
-                        new_dict[section_k] = section_v
-                    new_dict[section_k][user_k] = user_v
-                    delete_keys.append(user_k)
-                else:
-                    new_dict[section_k] = section_v
-            for delete_key in delete_keys:
-                del user_env_dict[delete_key]
-
-        if user_env_dict:
-            self.env["EXTRA"] = {}
-            for k, v in user_env_dict.items():
-                self.env["EXTRA"][k] = v
+            if env_var is None:
+                continue
+            self._set_var("EXTRA", env_var[0], env_var[1], "--env")
 
     def _log_env_vars(self):
         """Logs environment variables."""
@@ -381,6 +527,134 @@ class EnvironmentVariables:
             )
 
 
+class Module:
+    """A single Minipresto module. Metadata is held in a compact record; the
+    module's Docker Compose YAML is only parsed the first time `yaml_dict` is
+    accessed.
+
+    Supports dict-style access (`module["type"]`, `module.get("yaml_dict")`)
+    for backwards compatibility with code that treats modules as
+    dictionaries.
+
+    ### Parameters
+    - `name`: The module name.
+    - `type`: The module type (`catalog` or `security`).
+    - `module_dir`: The module's directory in the library.
+    - `yaml_file`: The module's Docker Compose YAML file.
+    - `description`: The module description from `metadata.json`.
+    - `incompatible_modules`: Modules this module cannot be provisioned with.
+    - `readiness`: Readiness checks from `metadata.json`, keyed by container
+      name, e.g. `{"elasticsearch": {"tcp_port": 9200}}` (see
+      `ReadinessMonitor`).
+
+    ### Public Attributes
+    - All parameters above.
+    - `yaml_dict`: The parsed Docker Compose YAML file.
+    - `labels`: Docker labels of the running module (set by
+      `Modules.get_running_modules()`).
+    - `containers`: Container objects of the running module (set by
+      `Modules.get_running_modules()`).
+
+    ### Public Methods
+    - `get()`: Gets an attribute by key, with a default.
+    - `keys()`: Returns the keys available through dict-style access.
+    - `to_dict()`: Returns the module as a dictionary."""
+
+    __slots__ = (
+        "name",
+        "type",
+        "module_dir",
+        "yaml_file",
+        "description",
+        "incompatible_modules",
+        "readiness",
+        "labels",
+        "containers",
+        "_yaml_dict",
+    )
+
+    # Fields persisted in the module cache
+    _CACHE_KEYS = (
+        "name",
+        "type",
+        "module_dir",
+        "yaml_file",
+        "description",
+        "incompatible_modules",
+        "readiness",
+    )
+
+    def __init__(
+        self,
+        name="",
+        type="",
+        module_dir="",
+        yaml_file="",
+        description="",
+        incompatible_modules=[],
+        readiness={},
+        yaml_dict=None,
+    ):
+
+        self.name = name
+        self.type = type
+        self.module_dir = module_dir
+        self.yaml_file = yaml_file
+        self.description = description
+        self.incompatible_modules = list(incompatible_modules)
+        self.readiness = dict(readiness)
+        self.labels = None
+        self.containers = None
+        self._yaml_dict = yaml_dict
+
+    @property
+    def yaml_dict(self):
+        """The module's parsed Docker Compose YAML file."""
+
+        if self._yaml_dict is None:
+            self._yaml_dict = _load_yaml(self.yaml_file)
+        return self._yaml_dict
+
+    @yaml_dict.setter
+    def yaml_dict(self, value):
+        self._yaml_dict = value
+
+    def keys(self):
+        keys = list(self._CACHE_KEYS) + ["yaml_dict"]
+        keys.extend(k for k in ("labels", "containers") if getattr(self, k) is not None)
+        return keys
+
+    def get(self, key, default=None):
+        if key not in self.keys():
+            return default
+        return getattr(self, key)
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.keys()}
+
+    def _to_cache(self):
+        return {k: getattr(self, k) for k in self._CACHE_KEYS}
+
+    def __getitem__(self, key):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key.startswith("_") or key not in self.__slots__ + ("yaml_dict",):
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __repr__(self):
+        return f"Module(name={self.name!r}, type={self.type!r})"
+
+
 class Modules:
     """Contains information about all valid Minipresto modules.
 
@@ -389,12 +663,15 @@ class Modules:
       for).
 
     ### Public Attributes
-    - `data`: A dictionary of module information.
+    - `data`: A dictionary of `Module` objects keyed by module name.
 
     ### Public Methods
     - `get_running_modules()`: Returns a dictionary with the same information as
       the `modules` attribute, but includes Docker labels and container objects
-      tied to the module."""
+      tied to the module.
+    - `invalidate_running_modules()`: Clears the running module index.
+    - `load_yaml()`: Parses the Docker Compose YAML of the given modules up
+      front."""
 
     @utils.exception_handler
     def __init__(self, ctx=None):
@@ -404,66 +681,121 @@ class Modules:
 
         self.data = {}
         self._ctx = ctx
+        self._running_index = None
         self._load_modules()
 
     def get_running_modules(self):
         """Returns dict of running modules (includes container objects and
-        Docker labels)."""
+        Docker labels). The running modules are looked up once per command
+        (see `invalidate_running_modules()`)."""
+
+        running = {}
+        for name, entries in self._get_running_index().items():
+            module = self.data[name]
+            module["containers"] = [container for container, _ in entries]
+            module["labels"] = {}
+            for _, label_set in entries:
+                module["labels"].update(label_set)
+            running[name] = module
+        return running
+
+    def invalidate_running_modules(self):
+        """Clears the running module index. Should be called after containers
+        are created or removed."""
+
+        self._running_index = None
+
+    def _get_running_index(self):
+        """Returns a dictionary of running module names to lists of
+        `(container, label_set)` tuples, where each label set holds the
+        container's module labels. Built from a single sparse list call, which
+        avoids inspecting each container, and memoized until invalidated.
+
+        Module labels on the Presto container (from modules that only mount
+        files into Presto) count toward their modules, too."""
+
+        if self._running_index is not None:
+            return self._running_index
 
         utils.check_daemon(self._ctx.docker_client)
         containers = self._ctx.docker_client.containers.list(
-            filters={"label": RESOURCE_LABEL}
+            filters={"label": RESOURCE_LABEL}, sparse=True
         )
 
-        if not containers:
-            return {}
-
-        # Remove Presto container since it isn't a module
-        for i, container in enumerate(containers):
-            if container.name == "presto":
-                del containers[i]
-
-        names = []
-        label_sets = []
-        for i, container in enumerate(containers):
-            label_set = {}
-            for k, v in container.labels.items():
-                if "catalog-" in v:
-                    names.append(v.lower().strip().replace("catalog-", ""))
-                elif "security-" in v:
-                    names.append(v.lower().strip().replace("security-", ""))
-                else:
-                    continue
-                label_set[k] = v
-            if not label_set and container.name != "presto":
+        prefix = f"{MODULE_LABEL_KEY_ROOT}."
+        index = {}
+        for container in containers:
+            # Sparse container objects lack the attributes read by
+            # `Container.name` and `Container.labels`
+            labels = container.attrs.get("Labels") or {}
+            container.attrs.setdefault("Name", container.attrs["Names"][0])
+            container.attrs.setdefault("Config", {"Labels": labels})
+
+            label_sets = {}
+            for k, v in labels.items():
+                if k.startswith(prefix):
+                    label_sets.setdefault(k[len(prefix) :], {})[k] = v
+            if not label_sets and container.name != "presto":
                 raise err.UserError(
                     f"Missing Minipresto labels for container '{container.name}'.",
                     f"Check this module's 'docker-compose.yml' file and ensure you are "
                     f"following the documentation on labels.",
                 )
-            label_sets.append(label_set)
 
-        running = {}
-        for name, label_set, container in zip(names, label_sets, containers):
-            if not isinstance(self.data.get(name), dict):
-                raise err.UserError(
-                    f"Module '{name}' is running, but it is not found "
-                    f"in the library. Was it deleted, or are you pointing "
-                    f"Minipresto to the wrong location?"
+            for name, label_set in label_sets.items():
+                if not isinstance(self.data.get(name), Module):
+                    raise err.UserError(
+                        f"Module '{name}' is running, but it is not found "
+                        f"in the library. Was it deleted, or are you pointing "
+                        f"Minipresto to the wrong location?"
+                    )
+                index.setdefault(name, []).append((container, label_set))
+
+        self._running_index = index
+        return index
+
+    def load_yaml(self, modules=[]):
+        """Parses the Docker Compose YAML files of the given modules up front,
+        fanning out across a process pool if there are enough modules to make
+        it worthwhile. Falls back to parsing serially if the pool cannot be
+        used. Modules whose YAML is already loaded are skipped.
+
+        ### Parameters
+        - `modules`: Names of the modules to load YAML for."""
+
+        to_load = []
+        for module in modules:
+            module = self.data.get(module)
+            if module is not None and module._yaml_dict is None:
+                to_load.append(module)
+
+        workers = min(os.cpu_count() or 1, len(to_load))
+        if workers > 1 and len(to_load) >= MODULE_PARSE_PARALLEL_THRESHOLD:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    yaml_dicts = executor.map(
+                        _load_yaml,
+                        [module.yaml_file for module in to_load],
+                        chunksize=max(1, len(to_load) // (workers * 4)),
+                    )
+                    for module, yaml_dict in zip(to_load, yaml_dicts):
+                        module.yaml_dict = yaml_dict
+            except (OSError, BrokenProcessPool) as e:
+                self._ctx.logger.log(
+                    f"Failed to load module YAML in parallel ({str(e)}). "
+                    f"Loading serially...",
+                    level=self._ctx.logger.verbose,
                 )
-            if not running.get(name, False):
-                running[name] = self.data[name]
-            if not running.get("labels", False):
-                running[name]["labels"] = label_set
-            if not running.get(name).get("containers", False):
-                running[name]["containers"] = [container]
-            else:
-                running[name]["containers"].append(container)
 
-        return running
+        # Lazily loads anything not loaded above
+        for module in to_load:
+            module.yaml_dict
 
     def _load_modules(self):
-        """Loads module data during instantiation."""
+        """Loads module metadata during instantiation. Parsed modules are cached
+        in the Minipresto user directory; a module is only re-parsed if its
+        Compose or metadata files changed since the cache was written. Compose
+        YAML is not parsed here (see `Module.yaml_dict` and `load_yaml()`)."""
 
         self._ctx.logger.log("Loading modules...", level=self._ctx.logger.verbose)
 
@@ -474,6 +806,11 @@ class Modules:
                 f"Are you pointing to a compatible Minipresto library?"
             )
 
+        cache = self._read_cache()
+        cached_modules = cache.get("modules", {})
+        new_cache_modules = {}
+        parsed = 0
+
         # Loop through both catalog and security modules
         sections = [
             os.path.join(modules_dir, MODULE_CATALOG),
@@ -492,53 +829,415 @@ class Modules:
                     )
                     continue
 
-                # List inner-module files
-                module_files = os.listdir(module_dir)
+                module_name = os.path.basename(module_dir)
+                yaml_basename = f"{module_name}.yml"
+                yaml_file = os.path.join(module_dir, yaml_basename)
+                json_file = os.path.join(module_dir, "metadata.json")
 
-                yaml_basename = f"{os.path.basename(module_dir)}.yml"
-                if not yaml_basename in module_files:
+                signature = self._module_signature(yaml_file, json_file)
+                if signature[0] is None:
                     raise err.UserError(
                         f"Missing Docker Compose file in module directory {_dir}. "
                         f"Expected file to be present: {yaml_basename}",
                         hint_msg="Check this module in your library to ensure it is properly constructed.",
                     )
 
-                # Module dir and YAML exist, add to modules
-                module_name = os.path.basename(module_dir)
-                self.data[module_name] = {}
-                self.data[module_name]["type"] = os.path.basename(section_dir)
-                self.data[module_name]["module_dir"] = module_dir
+                cached = cached_modules.get(module_dir, {})
+                if cached.get("signature") == signature:
+                    self.data[module_name] = Module(**cached.get("module"))
+                else:
+                    module, has_metadata = _parse_module_metadata(
+                        module_name, section_dir, module_dir
+                    )
+                    if not has_metadata:
+                        self._ctx.logger.log(
+                            f"No JSON metadata file for module '{module_name}'. "
+                            f"Will not load metadata for module.",
+                            level=self._ctx.logger.verbose,
+                        )
+                    self.data[module_name] = module
+                    parsed += 1
 
-                # Add YAML file path
-                yaml_file = os.path.join(module_dir, yaml_basename)
-                self.data[module_name]["yaml_file"] = yaml_file
+                new_cache_modules[module_dir] = {
+                    "signature": signature,
+                    "module": self.data[module_name]._to_cache(),
+                }
 
-                # Add YAML dict
-                with open(yaml_file) as f:
-                    self.data[module_name]["yaml_dict"] = yaml.load(
-                        f, Loader=yaml.FullLoader
-                    )
+        self._ctx.logger.log(
+            f"Parsed {parsed} module(s) and loaded "
+            f"{len(self.data) - parsed} module(s) from cache.",
+            level=self._ctx.logger.verbose,
+        )
 
-                # Get metadata.json if present
-                json_basename = "metadata.json"
-                json_file = os.path.join(module_dir, json_basename)
-                metadata = {}
-                if os.path.isfile(json_file):
-                    with open(json_file) as f:
-                        metadata = json.load(f)
-                else:
-                    self._ctx.logger.log(
-                        f"No JSON metadata file for module '{module_name}'. "
-                        f"Will not load metadata for module.",
-                        level=self._ctx.logger.verbose,
-                    )
+        # Only rewrite the cache if something was added, changed, or removed
+        if parsed or len(new_cache_modules) != len(cached_modules):
+            self._write_cache(new_cache_modules)
+
+    def _module_signature(self, *files):
+        """Returns a list of `[mtime_ns, size]` pairs for each file. Missing
+        files have a `None` entry, so adding or removing a file changes the
+        signature."""
+
+        signature = []
+        for f in files:
+            try:
+                st = os.stat(f)
+                signature.append([st.st_mtime_ns, st.st_size])
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def _cache_key(self):
+        """Returns the values that the module cache is keyed by. If any of them
+        differ from the cached values, the whole cache is discarded."""
+
+        lib_dir = str(self._ctx.minipresto_lib_dir)
+        return {
+            "cache_version": MODULE_CACHE_VERSION,
+            "lib_dir": lib_dir,
+            "lib_ver": utils.get_lib_ver(lib_dir),
+        }
 
-                self.data[module_name]["description"] = metadata.get(
-                    "description", "No module description provided."
-                )
-                self.data[module_name]["incompatible_modules"] = metadata.get(
-                    "incompatible_modules", []
-                )
+    def _read_cache(self):
+        """Reads the module cache file. Returns an empty dict if the cache does
+        not exist, cannot be read, or belongs to a different library."""
+
+        cache_file = os.path.join(self._ctx.minipresto_user_dir, MODULE_CACHE_FILE)
+        try:
+            with open(cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(cache, dict) or cache.get("key") != self._cache_key():
+            return {}
+        return cache
+
+    def _write_cache(self, cache_modules={}):
+        """Atomically writes the module cache file. Failures are logged and
+        otherwise ignored, as the cache is only an optimization."""
+
+        cache_file = os.path.join(self._ctx.minipresto_user_dir, MODULE_CACHE_FILE)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        cache = {"key": self._cache_key(), "modules": cache_modules}
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_file, cache_file)
+        except (OSError, TypeError, ValueError) as e:
+            self._ctx.logger.log(
+                f"Failed to write module cache to {cache_file}: {str(e)}",
+                level=self._ctx.logger.verbose,
+            )
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+
+
+def _load_yaml(yaml_file=""):
+    """Loads a YAML file. This is a module-level function so that it can be run
+    in a worker process."""
+
+    with open(yaml_file) as f:
+        return yaml.load(f, Loader=YamlLoader)
+
+
+def _parse_module_metadata(module_name="", section_dir="", module_dir=""):
+    """Parses a single module's metadata JSON file.
+
+    ### Return Values
+    - A tuple of `(module, has_metadata)`, where `module` is a `Module` object
+      and `has_metadata` is `False` if the module has no metadata file."""
+
+    json_file = os.path.join(module_dir, "metadata.json")
+    metadata = {}
+    has_metadata = os.path.isfile(json_file)
+    if has_metadata:
+        with open(json_file) as f:
+            metadata = json.load(f)
+
+    module = Module(
+        name=module_name,
+        type=os.path.basename(section_dir),
+        module_dir=module_dir,
+        yaml_file=os.path.join(module_dir, f"{module_name}.yml"),
+        description=metadata.get("description", "No module description provided."),
+        incompatible_modules=metadata.get("incompatible_modules", []),
+        readiness=metadata.get("readiness", {}),
+    )
+    return module, has_metadata
+
+
+class ProvisionJournal:
+    """Records the phases a provision has completed in
+    `~/.minipresto/state/provision.json`, along with the data later phases
+    need, so that a failed provision can be resumed from its first incomplete
+    phase. The journal is written atomically after each phase.
+
+    ### Parameters
+    - `ctx`: Instantiated Environment object (with user input already accounted
+      for).
+
+    ### Public Attributes
+    - `modules`: The modules being provisioned.
+    - `docker_native`: The native Docker Compose options of the provision.
+
+    ### Public Methods
+    - `start()`: Starts a new journal, replacing any existing one.
+    - `load()`: Loads an existing journal.
+    - `is_complete()`: Returns `True` if a phase has been completed.
+    - `has_progress()`: Returns `True` if any phase has been completed.
+    - `complete()`: Marks a phase as completed and stores its data.
+    - `get()`: Gets data stored by a completed phase.
+    - `clear()`: Deletes the journal."""
+
+    def __init__(self, ctx=None):
+
+        if not ctx:
+            raise utils.handle_missing_param(["ctx"])
+
+        self.modules = []
+        self.docker_native = ""
+
+        self._ctx = ctx
+        self._file = os.path.join(
+            ctx.minipresto_user_dir, STATE_DIR, PROVISION_JOURNAL_FILE
+        )
+        self._completed = []
+        self._data = {}
+
+    def start(self, modules=[], docker_native="", **data):
+        """Starts a new journal for a provision of the given modules. Data must
+        be JSON-serializable."""
+
+        self.modules = sorted(modules)
+        self.docker_native = docker_native
+        self._completed = []
+        self._data = data
+        self._write()
+
+    def load(self):
+        """Loads an existing journal. Returns `False` if there is none."""
+
+        try:
+            with open(self._file) as f:
+                journal = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            raise err.MiniprestoError(
+                f"Failed to read provisioning journal at {self._file}: {str(e)}"
+            )
+
+        self.modules = journal.get("modules", [])
+        self.docker_native = journal.get("docker_native", "")
+        self._completed = journal.get("completed", [])
+        self._data = journal.get("data", {})
+        return True
+
+    def is_complete(self, phase=""):
+        return phase in self._completed
+
+    def has_progress(self):
+        return bool(self._completed)
+
+    def complete(self, phase="", **data):
+        """Marks a phase as completed and stores any data later phases need.
+        Data must be JSON-serializable."""
+
+        self._data.update(data)
+        if phase not in self._completed:
+            self._completed.append(phase)
+        self._write()
+
+    def get(self, key="", default=None):
+        return self._data.get(key, default)
+
+    def clear(self):
+        try:
+            os.remove(self._file)
+        except FileNotFoundError:
+            pass
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self._file), exist_ok=True)
+        tmp_file = f"{self._file}.{os.getpid()}.tmp"
+        journal = {
+            "modules": self.modules,
+            "docker_native": self.docker_native,
+            "completed": self._completed,
+            "data": self._data,
+        }
+        with open(tmp_file, "w") as f:
+            json.dump(journal, f, indent=2)
+        os.replace(tmp_file, self._file)
+
+
+class OutputPipeline:
+    """Streams command output to the user's terminal and captures it. Output
+    is processed as bytes in blocks of complete lines (batched when it isn't
+    logged): ANSI escape sequences are stripped, and the result is written to a
+    capture buffer that spills to a temporary file once it grows past a
+    threshold. The capture is decoded once, when the pipeline is closed. If the
+    output is logged, each block is also decoded incrementally (multi-byte
+    characters split across chunks are handled) and logged. Output is only
+    logged if the logger would write it somewhere (see `Logger.is_enabled()`).
+
+    ### Parameters
+    - `ctx`: Instantiated Environment object (with user input already accounted
+      for).
+    - `log_output`: If `True`, each line is logged to the user's terminal as
+      verbose output.
+    - `capture_limit`: The maximum number of bytes to capture. Output past the
+      limit is still logged, but not captured. `None` captures all output.
+    - `spill_threshold`: The number of captured bytes to hold in memory before
+      spilling the capture buffer to a temporary file.
+    - `prefix`: If provided, logged lines are prefixed with `[<prefix>]`. Useful
+      for telling apart the output of commands running concurrently.
+
+    ### Public Attributes
+    - `truncated`: `True` if output was dropped from the capture buffer because
+      of `capture_limit`.
+
+    ### Public Methods
+    - `write()`: Feeds a chunk of output (bytes or string) to the pipeline.
+    - `close()`: Flushes any remaining output and returns the captured output.
+
+    ### Usage
+    ```python
+    pipeline = OutputPipeline(ctx)
+    for chunk in output_generator:
+        pipeline.write(chunk)
+    output = pipeline.close()
+    ```"""
+
+    def __init__(
+        self,
+        ctx=None,
+        log_output=True,
+        capture_limit=None,
+        spill_threshold=OUTPUT_SPILL_THRESHOLD,
+        prefix="",
+    ):
+
+        if not ctx:
+            raise utils.handle_missing_param(["ctx"])
+
+        self.truncated = False
+
+        self._ctx = ctx
+        self._log_output = log_output and ctx.logger.is_enabled(ctx.logger.verbose)
+        self._prefix = f"[{prefix}] " if prefix else ""
+        self._capture_limit = capture_limit
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._capture = tempfile.SpooledTemporaryFile(max_size=spill_threshold)
+        self._captured = 0
+        self._capture_pending = []
+        self._capture_pending_size = 0
+        self._partial = b""
+        self._pending = []
+        self._pending_size = 0
+        self._started_stream = False
+
+    def write(self, chunk=b""):
+        """Feeds a chunk of output to the pipeline. Only complete lines are
+        logged; a trailing partial line is held until the next chunk (or
+        `close()`)."""
+
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if not chunk:
+            return
+        if not self._log_output:
+            # Nothing is waiting on the output, so process it in larger batches
+            self._pending.append(chunk)
+            self._pending_size += len(chunk)
+            if self._pending_size < OUTPUT_BATCH_SIZE:
+                return
+            chunk = b"".join(self._pending)
+            self._pending = []
+            self._pending_size = 0
+
+        data = self._partial + chunk if self._partial else chunk
+        end = data.rfind(b"\n") + 1
+        if not end and len(data) > OUTPUT_READ_SIZE:
+            # Don't hold on to an overly long line; only keep what could be
+            # the start of an escape sequence
+            end = data.rfind(b"\x1b")
+            end = len(data) if end <= 0 else end
+        self._partial = data[end:]
+        if end:
+            self._process(data[:end])
+
+    def close(self):
+        """Flushes any remaining output and returns the captured output as a
+        string. The pipeline cannot be written to after it is closed."""
+
+        if self._pending:
+            self._partial += b"".join(self._pending)
+            self._pending = []
+        if self._partial:
+            self._process(self._partial, final=True)
+            self._partial = b""
+        if self._log_output:
+            self._ctx.logger.flush()
+
+        self._flush_capture()
+        self._capture.seek(0)
+        output = self._capture.read()
+        self._capture.close()
+        return output.decode(errors="replace")
+
+    def _process(self, block=b"", final=False):
+        """Strips, captures, and logs a block of output made up of complete
+        lines (except, when closing, a final unterminated line)."""
+
+        if b"\x1b" in block:
+            block = ANSI_BYTES_REGEX.sub(b"", block)
+        self._write_capture(block)
+        if self._log_output:
+            self._log(self._decoder.decode(block, final=final))
+
+    def _log(self, text=""):
+        """Logs decoded output."""
+
+        if not text:
+            return
+        logger = self._ctx.logger
+        if not self._started_stream:
+            logger.log(f"{self._prefix}Command Output:", level=logger.verbose)
+            self._started_stream = True
+        if self._prefix:
+            text = "".join(f"{self._prefix}{line}\n" for line in text.splitlines())
+        logger.log(text, level=logger.verbose, stream=True)
+
+    def _write_capture(self, chunk=b""):
+        """Writes raw output to the capture buffer, respecting the capture
+        limit."""
+
+        if self._capture_limit is not None:
+            remaining = self._capture_limit - self._captured
+            if remaining <= 0:
+                self.truncated = True
+                return
+            if len(chunk) > remaining:
+                chunk = chunk[:remaining]
+                self.truncated = True
+        self._captured += len(chunk)
+        # Small writes are batched, as each write to the capture buffer has a
+        # fixed cost
+        self._capture_pending.append(chunk)
+        self._capture_pending_size += len(chunk)
+        if self._capture_pending_size >= OUTPUT_BATCH_SIZE:
+            self._flush_capture()
+
+    def _flush_capture(self):
+        """Writes batched output to the capture buffer."""
+
+        self._capture.write(b"".join(self._capture_pending))
+        self._capture_pending = []
+        self._capture_pending_size = 0
 
 
 class CommandExecutor:
@@ -551,7 +1250,9 @@ class CommandExecutor:
 
     ### Public Methods
     - `execute_commands()`: Executes commands in the user's shell or inside of a
-        container."""
+        container.
+    - `invalidate_container()`: Clears cached data for a container. Should be
+      called when a container is restarted."""
 
     @utils.exception_handler
     def __init__(self, ctx=None):
@@ -561,6 +1262,10 @@ class CommandExecutor:
 
         self._ctx = ctx
 
+        # Container environments keyed by container ID; lives for the duration
+        # of a single CLI invocation
+        self._container_env_cache = {}
+
     def execute_commands(self, *args, **kwargs):
         """Executes commands in the user's shell or inside of a container.
         Returns output as well as stores the output in the `output` attribute.
@@ -580,6 +1285,11 @@ class CommandExecutor:
           be executed through the Docker SDK instead of the subprocess module.
         - `docker_user`: The user to execute the command as in the Docker
           container (default: `root`).
+        - `capture_limit`: The maximum number of output bytes to capture in
+          the returned `output` (default: no limit). Output past the limit is
+          still logged.
+        - `output_prefix`: A prefix for each logged line of output, e.g. the
+          name of the container the command is executed in.
 
         ### Return Values
         - A list of dicts with each dict containing the following keys:
@@ -592,14 +1302,19 @@ class CommandExecutor:
             kwargs["environment"] = self._construct_environment(
                 kwargs.get("environment", {}), kwargs.get("container", None)
             )
+            container_name = kwargs["container"].name
             for command in args:
-                output.append(self._execute_in_container(command, **kwargs))
+                with self._ctx.tracer.span(
+                    f"exec {container_name}", "exec", command=command
+                ):
+                    output.append(self._execute_in_container(command, **kwargs))
         else:
             kwargs["environment"] = self._construct_environment(
                 kwargs.get("environment", {})
             )
             for command in args:
-                output.append(self._execute_in_shell(command, **kwargs))
+                with self._ctx.tracer.span("shell", "shell", command=command):
+                    output.append(self._execute_in_shell(command, **kwargs))
 
         return output
 
@@ -617,41 +1332,32 @@ class CommandExecutor:
             env=kwargs.get("environment", {}),
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            universal_newlines=True,
         )
 
-        if not kwargs.get("suppress_output", False):
-            # Stream the output of the executed command line-by-line.
-            # `universal_newlines=True` ensures output is generated as a string,
-            # so there is no need to decode bytes. The only cleansing we need to
-            # do is to run the string through the `_strip_ansi()` function.
-
-            started_stream = False
+        # Stream the combined stdout/stderr of the command through the output
+        # pipeline as it is produced
+        pipeline = self._output_pipeline(**kwargs)
+        try:
             while True:
-                output_line = process.stdout.readline()
-                if output_line == "" and process.poll() is not None:
+                chunk = process.stdout.read1(OUTPUT_READ_SIZE)
+                if not chunk:
                     break
-                output_line = self._strip_ansi(output_line)
-                if not started_stream:
-                    self._ctx.logger.log(
-                        "Command Output:", level=self._ctx.logger.verbose
-                    )
-                    started_stream = True
-                self._ctx.logger.log(
-                    output_line, level=self._ctx.logger.verbose, stream=True
-                )
+                pipeline.write(chunk)
+        finally:
+            output = pipeline.close()
+            process.stdout.close()
+        return_code = process.wait()
 
-        output, _ = process.communicate()  # Get full output (stdout + stderr)
-        if process.returncode != 0 and kwargs.get("trigger_error", True):
+        if return_code != 0 and kwargs.get("trigger_error", True):
             raise err.MiniprestoError(
                 f"Failed to execute shell command:\n{command}\n"
-                f"Exit code: {process.returncode}"
+                f"Exit code: {return_code}"
             )
 
         return {
             "command": command,
-            "output": self._strip_ansi(output),
-            "return_code": process.returncode,
+            "output": output,
+            "return_code": return_code,
         }
 
     def _execute_in_container(self, command="", **kwargs):
@@ -679,43 +1385,16 @@ class CommandExecutor:
             user=kwargs.get("docker_user", "root"),
         )
 
-        # `output` is a generator that yields response chunks
+        # `output_generator` yields raw response chunks, which are not
+        # guaranteed to be full lines (or even full characters)
         output_generator = self._ctx.api_client.exec_start(exec_handler, stream=True)
 
-        # Output from the generator is returned as bytes, so they need to be
-        # decoded to strings. Response chunks are not guaranteed to be full
-        # lines. A newline in the output chunk will trigger a log dump of the
-        # current `full_line` up to the first newline in the current chunk. The
-        # remainder of the chunk (if any) resets the `full_line` var, then log
-        # dumped when the next newline is received.
-
-        output = ""
-        full_line = ""
-        started_stream = False
-        for chunk in output_generator:
-            chunk = self._strip_ansi(chunk.decode())
-            output += chunk
-            chunk = chunk.split("\n", 1)
-            if len(chunk) > 1:  # Indicates newline present
-                full_line += chunk[0]
-                if not kwargs.get("suppress_output", False):
-                    if not started_stream:
-                        self._ctx.logger.log(
-                            "Command Output:", level=self._ctx.logger.verbose
-                        )
-                        started_stream = True
-                    self._ctx.logger.log(
-                        full_line, level=self._ctx.logger.verbose, stream=True
-                    )
-                    full_line = ""
-                if chunk[1]:
-                    full_line = chunk[1]
-            else:
-                full_line += chunk[0]
-
-        # Catch lingering full line post-loop
-        if not kwargs.get("suppress_output", False) and full_line:
-            self._ctx.logger.log(full_line, level=self._ctx.logger.verbose, stream=True)
+        pipeline = self._output_pipeline(**kwargs)
+        try:
+            for chunk in output_generator:
+                pipeline.write(chunk)
+        finally:
+            output = pipeline.close()
 
         # Get the exit code
         return_code = self._ctx.api_client.exec_inspect(exec_handler["Id"]).get(
@@ -730,44 +1409,566 @@ class CommandExecutor:
 
         return {"command": command, "output": output, "return_code": return_code}
 
+    def _output_pipeline(self, **kwargs):
+        """Returns an `OutputPipeline` configured from `execute_commands()`
+        keyword arguments."""
+
+        return OutputPipeline(
+            self._ctx,
+            log_output=not kwargs.get("suppress_output", False),
+            capture_limit=kwargs.get("capture_limit", None),
+            prefix=kwargs.get("output_prefix", ""),
+        )
+
+    def invalidate_container(self, container=None):
+        """Clears cached data for a container, e.g. after the container is
+        restarted. If no container is provided, the data for all containers is
+        cleared.
+
+        ### Parameters
+        - `container`: A Docker container object."""
+
+        if container is None:
+            self._container_env_cache.clear()
+        else:
+            self._container_env_cache.pop(container.id, None)
+
     def _construct_environment(self, environment={}, container=None):
         """Merges provided environment dictionary with user's shell environment
         variables. For shell execution, the host environment will be set to the
         existing variables in the host environment. For container execution, the
         host environment will be set to the container's existing environment
-        variables."""
+        variables, which are inspected once per container and cached.
 
-        # Remove conflicting keys from host environment; Minipresto environment
-        # variables take precendance
+        Minipresto environment variables take precedence over conflicting keys
+        in the host environment. Returns a new dictionary."""
 
         if not container:
             host_environment = os.environ.copy()
         else:
-            host_environment_list = self._ctx.api_client.inspect_container(
-                container.id
-            )["Config"]["Env"]
-            host_environment = {}
-            for env_var in host_environment_list:
-                env_var = utils.parse_key_value_pair(env_var)
-                host_environment[env_var[0]] = env_var[1]
+            host_environment = self._container_env_cache.get(container.id)
+            if host_environment is None:
+                host_environment_list = self._ctx.api_client.inspect_container(
+                    container.id
+                )["Config"]["Env"]
+                host_environment = {}
+                for env_var in host_environment_list:
+                    env_var = utils.parse_key_value_pair(env_var)
+                    if env_var is None:
+                        continue
+                    host_environment[env_var[0]] = env_var[1]
+                self._container_env_cache[container.id] = host_environment
+            host_environment = host_environment.copy()
 
         if environment:
-            delete_keys = []
-            for host_key, host_value in host_environment.items():
-                for key, value in environment.items():
-                    if key == host_key:
-                        delete_keys.append(host_key)
-            for delete_key in delete_keys:
-                del host_environment[delete_key]
-
-        # Merge environment argument with copy of existing environment
-        environment.update(host_environment)
-        return environment
-
-    def _strip_ansi(self, value=""):
-        """Strips ANSI escape sequences from strings."""
-
-        # Strip ANSI codes before Click so that our logging helpers
-        # know if it's an empty string or not.
-        ansi_regex = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-        return ansi_regex.sub("", value)
+            host_environment.update(environment)
+        return host_environment
+
+
+class ContainerFiles:
+    """Reads and writes files inside containers. Whole files are transferred in
+    a single tar stream with the Docker archive API instead of one command
+    execution per line, and writes replace files atomically: content is
+    uploaded next to the target file, then renamed over it.
+
+    ### Parameters
+    - `ctx`: Instantiated Environment object (with user input already accounted
+      for).
+
+    ### Public Methods
+    - `read_file()`: Returns the contents of a file in a container.
+    - `write_file()`: Creates or replaces a file in a container.
+    - `append_file()`: Appends content to a file in a container.
+    - `upload_files()`: Writes several files to a container in one tar
+      stream.
+
+    ### Usage
+    ```python
+    container = ctx.docker_client.containers.get("presto")
+    config = ctx.container_files.read_file(container, "/etc/config.properties")
+    ctx.container_files.write_file(container, "/etc/config.properties", config)
+    ```"""
+
+    @utils.exception_handler
+    def __init__(self, ctx=None):
+
+        if not ctx:
+            raise utils.handle_missing_param(list(locals().keys()))
+
+        self._ctx = ctx
+
+    def read_file(self, container=None, path="", default=None):
+        """Returns the contents of a file in a container as a string, or
+        `default` if the file does not exist.
+
+        ### Parameters
+        - `container`: A Docker container object.
+        - `path`: The absolute path of the file in the container.
+        - `default`: The value to return if the file does not exist."""
+
+        content, _ = self._get_file(container, path)
+        if content is None:
+            return default
+        return content.decode(errors="replace")
+
+    def write_file(self, container=None, path="", content="", mode=None):
+        """Creates or replaces a file in a container. If the file exists, its
+        owner and permissions are preserved.
+
+        ### Parameters
+        - `container`: A Docker container object.
+        - `path`: The absolute path of the file in the container.
+        - `content`: The file contents (string or bytes).
+        - `mode`: The file permissions. Defaults to the existing file's
+          permissions, or `0o644` for a new file."""
+
+        if not container or not path:
+            raise utils.handle_missing_param(["container", "path"])
+
+        _, tar_info = self._get_file(container, path, read=False)
+        self._put_file(container, path, content, tar_info, mode)
+
+    def append_file(self, container=None, path="", content=""):
+        """Appends content to a file in a container, creating the file if it
+        does not exist. The file is replaced atomically.
+
+        ### Parameters
+        - `container`: A Docker container object.
+        - `path`: The absolute path of the file in the container.
+        - `content`: The content to append (string or bytes)."""
+
+        if not container or not path:
+            raise utils.handle_missing_param(["container", "path"])
+
+        current, tar_info = self._get_file(container, path)
+        if isinstance(content, str):
+            content = content.encode()
+        self._put_file(container, path, (current or b"") + content, tar_info)
+
+    def upload_files(self, container=None, files={}):
+        """Writes several files to a container in a single tar stream. Parent
+        directories are created as needed. Unlike `write_file()`, existing
+        files are not replaced atomically.
+
+        ### Parameters
+        - `container`: A Docker container object.
+        - `files`: A dictionary of absolute container paths to `(content,
+          mode)` tuples, where `content` is a string or bytes."""
+
+        if not container:
+            raise utils.handle_missing_param(["container"])
+        if not files:
+            return
+
+        archive = io.BytesIO()
+        mtime = int(time.time())
+        with tarfile.open(fileobj=archive, mode="w") as tar:
+            for path, (content, mode) in files.items():
+                if isinstance(content, str):
+                    content = content.encode()
+                tar_info = tarfile.TarInfo(path.lstrip("/"))
+                tar_info.size = len(content)
+                tar_info.mode = mode
+                tar_info.mtime = mtime
+                tar.addfile(tar_info, io.BytesIO(content))
+
+        if not container.put_archive("/", archive.getvalue()):
+            raise err.MiniprestoError(
+                f"Failed to upload files to container '{container.name}'."
+            )
+
+    def _get_file(self, container=None, path="", read=True):
+        """Fetches a file from a container. Returns a tuple of the file's
+        contents (`None` if it does not exist or `read` is `False`) and its
+        `TarInfo` (`None` if it does not exist)."""
+
+        try:
+            stream, _ = container.get_archive(path)
+        except NotFound:
+            return None, None
+
+        with tarfile.open(fileobj=io.BytesIO(b"".join(stream))) as tar:
+            tar_info = tar.next()
+            if tar_info is None or not tar_info.isfile():
+                raise err.MiniprestoError(
+                    f"Path '{path}' in container '{container.name}' is not a file."
+                )
+            content = tar.extractfile(tar_info).read() if read else None
+        return content, tar_info
+
+    def _put_file(self, container=None, path="", content="", tar_info=None, mode=None):
+        """Uploads content to a temporary file beside `path`, then renames it
+        over `path`."""
+
+        if isinstance(content, str):
+            content = content.encode()
+
+        directory, filename = os.path.split(path)
+        tmp_name = f".{filename}.minipresto-tmp"
+
+        new_info = tarfile.TarInfo(tmp_name)
+        new_info.size = len(content)
+        new_info.mtime = int(time.time())
+        new_info.mode = 0o644
+        if tar_info is not None:
+            new_info.mode = tar_info.mode
+            new_info.uid, new_info.gid = tar_info.uid, tar_info.gid
+            new_info.uname, new_info.gname = tar_info.uname, tar_info.gname
+        if mode is not None:
+            new_info.mode = mode
+
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w") as tar:
+            tar.addfile(new_info, io.BytesIO(content))
+
+        if not container.put_archive(directory or "/", archive.getvalue()):
+            raise err.MiniprestoError(
+                f"Failed to write file '{path}' in container '{container.name}'."
+            )
+
+        # A rename fails if the target is a bind mount; fall back to an
+        # in-place copy in that case
+        tmp_path = os.path.join(directory, tmp_name)
+        self._ctx.cmd_executor.execute_commands(
+            f'bash -c \'mv -f "{tmp_path}" "{path}" 2>/dev/null || '
+            f'{{ cat "{tmp_path}" > "{path}" && rm -f "{tmp_path}"; }}\'',
+            container=container,
+            suppress_output=True,
+        )
+
+
+class ReadinessMonitor:
+    """Checks whether containers are ready to be used. Readiness checks are
+    declared per container (see `Module.readiness`) and polled concurrently from
+    the host, so a slow service does not hold up checks for other services.
+
+    A container's checks may include:
+    - `tcp_port`: A container port that must accept TCP connections.
+    - `http`: A dictionary with a container `port`, and optionally a `path`
+      (defaults to `/`) and a list of acceptable `status` codes (defaults to any
+      status below 400).
+    - `log_pattern`: A regular expression that must match a line of the
+      container's log output since the container started.
+    - `timeout`: The number of seconds to wait for the checks to pass. Defaults
+      to `READINESS_TIMEOUT`.
+
+    TCP and HTTP checks are retried with exponential backoff and jitter; log
+    patterns are matched by following the container's log stream. Ports that
+    cannot be reached from the host (unpublished ports on a remote Docker
+    daemon) are probed from inside the container instead. If a container stops
+    running before it is ready, or its checks time out, an error is raised when
+    the container is waited on.
+
+    ### Parameters
+    - `ctx`: Instantiated Environment object (with user input already accounted
+      for).
+    - `max_workers`: The maximum number of containers checked at once.
+
+    ### Public Methods
+    - `watch()`: Starts checking a container in the background.
+    - `rewatch()`: Checks a container again, e.g. after it is restarted.
+    - `wait()`: Blocks until the given containers are ready.
+    - `summary()`: Logs a time-to-ready table for the checked containers.
+    - `close()`: Stops any checks in progress.
+
+    ### Usage
+    ```python
+    readiness = ReadinessMonitor(ctx)
+    readiness.watch("ldap", {"tcp_port": 636})
+    readiness.wait(["ldap"])
+    readiness.close()
+    ```"""
+
+    @utils.exception_handler
+    def __init__(self, ctx=None, max_workers=READINESS_CONCURRENCY):
+
+        if not ctx:
+            raise utils.handle_missing_param(["ctx"])
+
+        self._ctx = ctx
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self._futures = {}
+        self._checks = {}
+        self._streams = set()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def watch(self, container_name="", checks={}):
+        """Starts checking a container's readiness in the background. If the
+        container is already being checked, this is a no-op.
+
+        ### Parameters
+        - `container_name`: The name of the container to check.
+        - `checks`: A dictionary of readiness checks."""
+
+        if not container_name:
+            raise utils.handle_missing_param(["container_name"])
+        if container_name in self._futures:
+            return
+
+        self._checks[container_name] = dict(checks)
+        self._futures[container_name] = self._executor.submit(
+            self._traced_check, container_name, dict(checks)
+        )
+
+    def rewatch(self, container_name=""):
+        """Checks a container's readiness again, e.g. after the container is
+        restarted. If the container was never checked, this is a no-op.
+
+        ### Parameters
+        - `container_name`: The name of the container to check."""
+
+        future = self._futures.pop(container_name, None)
+        if future is None:
+            return
+        future.cancel()
+        self.watch(container_name, self._checks[container_name])
+
+    def wait(self, container_names=None):
+        """Blocks until the given containers are ready. Containers that are not
+        being checked are ignored.
+
+        ### Parameters
+        - `container_names`: The containers to wait on. If `None`, all checked
+          containers are waited on."""
+
+        if container_names is None:
+            container_names = list(self._futures)
+        for container_name in container_names:
+            future = self._futures.get(container_name)
+            if future is not None:
+                future.result()
+
+    def summary(self):
+        """Logs the time each checked container took to be ready, measured from
+        the time the container started, slowest first."""
+
+        rows = []
+        for container_name, future in self._futures.items():
+            if not future.done() or future.exception() is not None:
+                continue
+            checks = ", ".join(
+                k for k in self._checks[container_name] if k != "timeout"
+            )
+            time_to_ready = future.result()
+            rows.append((container_name, checks, time_to_ready))
+
+        if not rows:
+            return
+
+        rows.sort(
+            key=lambda row: float("inf") if row[2] is None else row[2], reverse=True
+        )
+        name_width = max(len(row[0]) for row in rows)
+        check_width = max(len(row[1]) for row in rows)
+        lines = ["Time to ready:"]
+        for container_name, checks, time_to_ready in rows:
+            result = "timed out" if time_to_ready is None else f"{time_to_ready:.1f}s"
+            lines.append(
+                f"  {container_name:<{name_width}}  {checks:<{check_width}}  {result}"
+            )
+        self._ctx.logger.log("\n".join(lines))
+
+    def close(self):
+        """Stops any checks in progress and waits for them to return."""
+
+        self._closed.set()
+        with self._lock:
+            streams = list(self._streams)
+        for stream in streams:
+            stream.close()
+        self._executor.shutdown(wait=True)
+
+    def _traced_check(self, container_name="", checks={}):
+        with self._ctx.tracer.span(f"ready {container_name}", "readiness"):
+            return self._check_container(container_name, checks)
+
+    def _check_container(self, container_name="", checks={}):
+        """Runs a container's checks in order. Returns the number of seconds
+        between the container starting and passing its checks, or `None` if
+        the monitor was closed first. Raises an error if the checks time
+        out."""
+
+        container = self._ctx.docker_client.containers.get(container_name)
+        started_at = utils.parse_docker_timestamp(container.attrs["State"]["StartedAt"])
+        deadline = time.monotonic() + checks.get("timeout", READINESS_TIMEOUT)
+
+        self._ctx.logger.log(
+            f"Waiting for container '{container_name}' to be ready...",
+            level=self._ctx.logger.verbose,
+        )
+
+        ready = True
+        if checks.get("tcp_port"):
+            ready = self._poll(container, deadline, self._check_tcp, checks["tcp_port"])
+        if ready and checks.get("http"):
+            ready = self._poll(container, deadline, self._check_http, checks["http"])
+        if ready and checks.get("log_pattern"):
+            ready = self._follow_logs(container, deadline, checks["log_pattern"])
+
+        if not ready:
+            if self._closed.is_set():
+                return None
+            raise err.MiniprestoError(
+                f"Container '{container_name}' was not ready after "
+                f"{checks.get('timeout', READINESS_TIMEOUT)} seconds. Inspect the "
+                f"container logs, or raise the container's readiness timeout in "
+                f"the module's 'metadata.json' file if the service is slow to start."
+            )
+
+        time_to_ready = max(0.0, time.time() - started_at)
+        self._ctx.logger.log(
+            f"Container '{container_name}' ready {time_to_ready:.1f}s after starting.",
+            level=self._ctx.logger.verbose,
+        )
+        return time_to_ready
+
+    def _poll(self, container=None, deadline=0, check=None, arg=None):
+        """Retries a check until it passes or the deadline is reached, backing
+        off exponentially between attempts. Returns `True` if the check
+        passed."""
+
+        delay = READINESS_INITIAL_DELAY
+        while not self._closed.is_set():
+            if check(container, arg):
+                return True
+            self._check_running(container)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Sleep for a random duration between half and all of the current
+            # delay so that checks started together don't retry in lockstep
+            self._closed.wait(min(remaining, random.uniform(delay / 2, delay)))
+            delay = min(delay * 2, READINESS_MAX_DELAY)
+        return False
+
+    def _check_tcp(self, container=None, port=0):
+        address = self._address(container, port)
+        if address is None:
+            return self._check_tcp_in_container(container, port)
+        try:
+            with socket.create_connection(
+                address, timeout=READINESS_PROBE_TIMEOUT
+            ) as s:
+                # Docker's userland proxy accepts connections on published
+                # ports even when nothing is listening in the container, then
+                # closes them––an immediate EOF means the service is not up
+                s.settimeout(READINESS_PROBE_TIMEOUT / 4)
+                try:
+                    return s.recv(1) != b""
+                except socket.timeout:
+                    return True
+        except OSError:
+            return False
+
+    def _check_http(self, container=None, http_check={}):
+        address = self._address(container, http_check.get("port", 80))
+        if address is None:
+            # Containers can't be relied on to have an HTTP client, so only
+            # the port is checked
+            return self._check_tcp_in_container(container, http_check.get("port", 80))
+        url = f"http://{address[0]}:{address[1]}{http_check.get('path', '/')}"
+        try:
+            with urllib.request.urlopen(url, timeout=READINESS_PROBE_TIMEOUT) as r:
+                status = r.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (OSError, http_client.HTTPException):
+            return False
+        if http_check.get("status"):
+            return status in http_check["status"]
+        return status < 400
+
+    def _follow_logs(self, container=None, deadline=0, log_pattern=""):
+        """Follows a container's log stream from the time the container started
+        until a line matches `log_pattern`. Only new log output is transferred.
+        Returns `True` if a line matched."""
+
+        regex = re.compile(log_pattern)
+        started_at = utils.parse_docker_timestamp(container.attrs["State"]["StartedAt"])
+        stream = container.logs(stream=True, follow=True, since=int(started_at))
+        with self._lock:
+            self._streams.add(stream)
+
+        # Closing the stream from a timer thread ends the iteration below
+        timer = threading.Timer(max(0, deadline - time.monotonic()), stream.close)
+        timer.daemon = True
+        timer.start()
+
+        ready = False
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        try:
+            for chunk in stream:
+                pending += decoder.decode(chunk)
+                end = pending.rfind("\n")
+                if end == -1:
+                    continue
+                lines, pending = pending[:end], pending[end + 1 :]
+                if regex.search(lines):
+                    ready = True
+                    break
+            else:
+                # The stream ended; check a final line without a trailing newline
+                ready = bool(regex.search(pending + decoder.decode(b"", final=True)))
+        finally:
+            timer.cancel()
+            stream.close()
+            with self._lock:
+                self._streams.discard(stream)
+
+        if not ready and not self._closed.is_set():
+            self._check_running(container)
+        return ready
+
+    def _check_running(self, container=None):
+        container.reload()
+        if container.status != "running":
+            raise err.MiniprestoError(
+                f"Container '{container.name}' stopped running before it was ready. "
+                f"Inspect the container logs if the container is still available. If "
+                f"the container was rolled back, rerun the command with the "
+                f"'--no-rollback' option, then inspect the logs."
+            )
+
+    def _check_tcp_in_container(self, container=None, port=0):
+        """Checks that a port accepts TCP connections from inside the container,
+        the same way `wait-for-it.sh` does."""
+
+        try:
+            exit_code, _ = container.exec_run(
+                ["bash", "-c", f"exec 3<>/dev/tcp/127.0.0.1/{int(port)}"]
+            )
+        except APIError:
+            return False
+        return exit_code == 0
+
+    def _address(self, container=None, port=0):
+        """Returns a `(host, port)` tuple the host can reach a container port
+        at, or `None` if it can't be reached from the host. Published ports are
+        preferred; otherwise, the container's IP address is used if Docker runs
+        on the host."""
+
+        docker_host = self._docker_host()
+        settings = container.attrs.get("NetworkSettings", {})
+        bindings = (settings.get("Ports") or {}).get(f"{port}/tcp") or []
+        if bindings:
+            return docker_host or "localhost", int(bindings[0]["HostPort"])
+        if docker_host:
+            return None
+        for network in (settings.get("Networks") or {}).values():
+            if network.get("IPAddress"):
+                return network["IPAddress"], int(port)
+        return None
+
+    def _docker_host(self):
+        """Returns the hostname of a remote Docker daemon (`tcp://` or
+        `ssh://`), or `None` if the daemon runs on the host."""
+
+        docker_host = self._ctx.env.get_var("DOCKER_HOST", "")
+        docker_host = urlparse(docker_host or self._ctx.docker_client.api.base_url)
+        if docker_host.scheme in ("tcp", "http", "https", "ssh"):
+            hostname = docker_host.hostname
+            if hostname not in ("localhost", "127.0.0.1", "::1"):
+                return hostname
+        return None
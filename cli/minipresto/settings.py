@@ -4,6 +4,8 @@
 # Docker labels
 RESOURCE_LABEL = "com.starburst.tests=minipresto"
 MODULE_LABEL_KEY_ROOT = "com.starburst.tests.module"
+COMPOSE_SERVICE_LABEL = "com.docker.compose.service"
+COMPOSE_CONFIG_HASH_LABEL = "com.docker.compose.config-hash"
 
 # Generic Constants
 CONTAINER = "container"
@@ -19,11 +21,46 @@ PRESTO_CONFIG = "config.properties"
 PRESTO_JVM_CONFIG = "jvm.config"
 LIB_INDEPENDENT_CMDS = ["lib_install"]
 
+# Docker connection defaults (overridable in the [DOCKER] config section)
+DOCKER_POOL_SIZE = 10
+DOCKER_TIMEOUT = 60
+
+# Provisioning
+BOOTSTRAP_CONCURRENCY = 4  # Containers bootstrapped at once
+STOP_GRACE_PERIOD = 10  # Seconds a restarting container has to stop
+BOOTSTRAP_DIR = "/opt/minipresto/bootstrap"
+BOOTSTRAP_STATUS_FILE = "/opt/minipresto/bootstrap_status.txt"
+RESOURCES_DIR = "/opt/minipresto/resources"
+FINGERPRINT_FILE = "/opt/minipresto/fingerprint"
+READINESS_TIMEOUT = 60  # Seconds to wait for a container to be ready
+READINESS_CONCURRENCY = 16  # Containers checked for readiness at once
+READINESS_INITIAL_DELAY = 0.25  # Seconds between the first readiness probes
+READINESS_MAX_DELAY = 5.0  # Upper bound on the backoff between probes
+READINESS_PROBE_TIMEOUT = 2.0  # Seconds before a single TCP/HTTP probe fails
+PRESTO_READY_PATTERN = "======== SERVER STARTED ========"
+PRESTO_READY_TIMEOUT = 300  # Seconds to wait for the Presto server to start
+
+# Command output
+OUTPUT_READ_SIZE = 64 * 1024  # Bytes read from a shell command per chunk
+OUTPUT_BATCH_SIZE = 64 * 1024  # Bytes of unlogged output processed at once
+OUTPUT_SPILL_THRESHOLD = 1024 * 1024  # Captured bytes held in memory
+
+# Module cache
+MODULE_CACHE_FILE = "module_cache.json"
+MODULE_CACHE_VERSION = 3
+MODULE_PARSE_PARALLEL_THRESHOLD = 32
+
+# Provisioning state
+STATE_DIR = "state"
+PROVISION_JOURNAL_FILE = "provision.json"
+
 # Snapshots
 SNAPSHOT_ROOT_FILES = ["docker-compose.yml", "minipresto.env", "Dockerfile"]
 
 # Terminal
 DEFAULT_INDENT = " " * 5
+STREAM_BUFFER_LINES = 256  # Streamed lines buffered before a write
+STREAM_FLUSH_INTERVAL = 0.1  # Max seconds streamed lines are buffered
 
 # Scrub Keys
 SCRUB_KEYS = [
@@ -40,9 +77,15 @@ CONFIG_TEMPLATE = """
 [CLI]
 LIB_PATH=
 TEXT_EDITOR=
+BOOTSTRAP_CONCURRENCY=
+STOP_GRACE_PERIOD=
+PRESTO_READY_TIMEOUT=
 
 [DOCKER]
 DOCKER_HOST=
+DOCKER_POOL_SIZE=
+DOCKER_TIMEOUT=
+DOCKER_KEEP_ALIVE=
 
 [PRESTO]
 CONFIG=
@@ -0,0 +1,136 @@
+#!usr/bin/env/python3
+# -*- coding: utf-8 -*-
+
+# Benchmarks module loading against a synthetic library. This is not part of
+# the test runner; run it directly:
+#
+#   python ./cli/minipresto/test/benchmark_modules.py [module_count]
+
+import os
+import sys
+import json
+import time
+import yaml
+import shutil
+import tempfile
+
+from types import SimpleNamespace
+from minipresto import utils
+from minipresto.components import Modules
+from minipresto.settings import MODULE_ROOT
+from minipresto.settings import MODULE_CATALOG
+from minipresto.settings import MODULE_SECURITY
+
+MODULE_COUNT = 1000
+
+MODULE_YAML = """
+version: "3.7"
+services:
+
+  presto:
+    environment:
+      MINIPRESTO_BOOTSTRAP: "bootstrap-presto.sh"
+    volumes:
+      - "./modules/catalog/{name}/resources/presto/{name}.properties:/usr/lib/presto/etc/catalog/{name}.properties"
+
+  {name}:
+    image: "postgres:${{POSTGRES_VER}}"
+    container_name: "{name}"
+    env_file:
+      - "./modules/catalog/{name}/resources/postgres/postgres.env"
+    environment:
+      MINIPRESTO_BOOTSTRAP: "bootstrap-{name}.sh"
+    depends_on:
+      - "presto"
+    ports:
+      - "5432"
+    labels:
+      - "com.starburst.tests=minipresto"
+      - "com.starburst.tests.module.{name}=catalog-{name}"
+    volumes:
+      - "{name}-data:/var/lib/postgresql/data"
+
+volumes:
+  {name}-data:
+    labels:
+      - "com.starburst.tests=minipresto"
+      - "com.starburst.tests.module.{name}=catalog-{name}"
+"""
+
+
+def main():
+    module_count = int(sys.argv[1]) if len(sys.argv) > 1 else MODULE_COUNT
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        lib_dir = make_library(tmp_dir, module_count)
+        ctx = SimpleNamespace(
+            logger=utils.Logger(),
+            minipresto_lib_dir=lib_dir,
+            minipresto_user_dir=tmp_dir,
+        )
+
+        baseline = timed(baseline_load, lib_dir)
+        cold = timed(Modules, ctx)
+        warm = timed(Modules, ctx)
+        modules = Modules(ctx)
+        load_yaml = timed(modules.load_yaml, list(modules.data.keys()))
+
+        print(f"Modules: {module_count} (CPUs: {os.cpu_count()})")
+        print(f"Serial pure-Python loader:  {baseline:8.3f}s")
+        print(f"Metadata, cold cache:       {cold:8.3f}s ({baseline / cold:.1f}x)")
+        print(f"Metadata, warm cache:       {warm:8.3f}s ({baseline / warm:.1f}x)")
+        print(
+            f"Metadata + all YAML, cold:  {cold + load_yaml:8.3f}s "
+            f"({baseline / (cold + load_yaml):.1f}x)"
+        )
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def make_library(tmp_dir, module_count):
+    """Generates a synthetic library with `module_count` catalog modules."""
+
+    lib_dir = os.path.join(tmp_dir, "lib")
+    catalog_dir = os.path.join(lib_dir, MODULE_ROOT, MODULE_CATALOG)
+    os.makedirs(catalog_dir)
+    os.makedirs(os.path.join(lib_dir, MODULE_ROOT, MODULE_SECURITY))
+    with open(os.path.join(lib_dir, "minipresto.env"), "w") as f:
+        f.write("COMPOSE_PROJECT_NAME=minipresto\n")
+
+    for i in range(module_count):
+        name = f"module-{i}"
+        module_dir = os.path.join(catalog_dir, name)
+        os.mkdir(module_dir)
+        with open(os.path.join(module_dir, f"{name}.yml"), "w") as f:
+            f.write(MODULE_YAML.format(name=name))
+        with open(os.path.join(module_dir, "metadata.json"), "w") as f:
+            json.dump(
+                {"description": f"Synthetic module {i}.", "incompatible_modules": []},
+                f,
+            )
+    return lib_dir
+
+
+def baseline_load(lib_dir):
+    """Loads modules the way the original serial loader did."""
+
+    data = {}
+    catalog_dir = os.path.join(lib_dir, MODULE_ROOT, MODULE_CATALOG)
+    for _dir in os.listdir(catalog_dir):
+        module_dir = os.path.join(catalog_dir, _dir)
+        with open(os.path.join(module_dir, f"{_dir}.yml")) as f:
+            yaml_dict = yaml.load(f, Loader=yaml.FullLoader)
+        with open(os.path.join(module_dir, "metadata.json")) as f:
+            metadata = json.load(f)
+        data[_dir] = {"yaml_dict": yaml_dict, **metadata}
+    return data
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!usr/bin/env/python3
+# -*- coding: utf-8 -*-
+
+# Benchmarks command output streaming with bootstrap-style output. This is not
+# part of the test runner; run it directly:
+#
+#   python ./cli/minipresto/test/benchmark_output.py [megabytes] [--log]
+#
+# Both loops stream output to the logger, as commands do unless their output is
+# suppressed. Without `--log`, the logger is not verbose, so the output is
+# discarded (as when provisioning without `-v`). With `--log`, it is logged (to
+# /dev/null), as when provisioning with `-v`.
+
+import os
+import re
+import sys
+import time
+import contextlib
+
+from types import SimpleNamespace
+from minipresto import utils
+from minipresto.components import OutputPipeline
+
+MEGABYTES = 100
+CHUNK_SIZE = 4093  # Deliberately unaligned with lines and characters
+REPEAT = 5  # The best of several runs is reported
+
+LINES = [
+    "\x1b[32mINFO\x1b[0m  Importing keystore /tmp/keystore.jks to /tmp/keystore.p12...\n",
+    "Entry for alias presto successfully imported. Größe: 2048 bits\n",
+    "Certificate stored in file </etc/ssl/presto.crt> ✓\n",
+    '{"index":{"_index":"user","_id":"42"}} {"name":"bob","age":33}\n',
+    "wait-for-it.sh: ranger-admin:6080 is available after 12 seconds\n",
+]
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    log = "--log" in sys.argv
+    megabytes = int(args[0]) if args else MEGABYTES
+
+    block = "".join(LINES).encode() * 1000
+    data = block * max(1, (megabytes * 1024 * 1024) // len(block))
+    chunks = [data[i : i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+    size_mb = len(data) / (1024 * 1024)
+
+    ctx = SimpleNamespace(logger=utils.Logger(log_verbose=log))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        baseline, baseline_output = timed(baseline_stream, ctx, chunks, log)
+        pipeline, pipeline_output = timed(pipeline_stream, ctx, chunks, log)
+
+    print(f"Streamed {size_mb:.0f} MB in {len(chunks)} chunks (logging: {log})")
+    print(f"Best of {REPEAT} runs:")
+    print(f"Original loop:   {baseline:7.2f}s ({size_mb / baseline:7.1f} MB/s)")
+    print(f"OutputPipeline:  {pipeline:7.2f}s ({size_mb / pipeline:7.1f} MB/s)")
+    print(f"Original captured {len(baseline_output)} chars (mangled lines possible)")
+    print(f"Pipeline captured {len(pipeline_output)} chars")
+
+
+def baseline_stream(ctx, chunks, log):
+    """The original `_execute_in_container()` output loop."""
+
+    output = ""
+    full_line = ""
+    for chunk in chunks:
+        ansi_regex = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+        chunk = ansi_regex.sub("", chunk.decode(errors="replace"))
+        output += chunk
+        chunk = chunk.split("\n", 1)
+        if len(chunk) > 1:
+            full_line += chunk[0]
+            ctx.logger.log(full_line, level=ctx.logger.verbose, stream=True)
+            full_line = chunk[1]
+        else:
+            full_line += chunk[0]
+    return output
+
+
+def pipeline_stream(ctx, chunks, log):
+    pipeline = OutputPipeline(ctx)
+    for chunk in chunks:
+        pipeline.write(chunk)
+    return pipeline.close()
+
+
+def timed(func, *args):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+if __name__ == "__main__":
+    main()
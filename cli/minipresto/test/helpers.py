@@ -41,14 +41,16 @@ class MiniprestoResult:
         self.exit_code = exit_code
 
 
-def execute_command(command=[], print_output=True, command_input=""):
-    """Executes a command through the Click CliRunner."""
+def execute_command(command=[], print_output=True, command_input="", obj=None):
+    """Executes a command through the Click CliRunner. If `obj` is provided, it
+    is used as the command's Environment object so that it can be inspected
+    after the command completes."""
 
     runner = CliRunner()
     if not command_input:
-        result = runner.invoke(cli, command)
+        result = runner.invoke(cli, command, obj=obj)
     else:
-        result = runner.invoke(cli, command, input=command_input)
+        result = runner.invoke(cli, command, input=command_input, obj=obj)
     if print_output:
         print(f"Output of command [minipresto {' '.join(command)}]:\n{result.output}")
 
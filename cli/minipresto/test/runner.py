@@ -4,6 +4,7 @@
 import minipresto.test.test_misc as test_misc
 import minipresto.test.test_cmd_config as test_config
 import minipresto.test.test_cmd_down as test_down
+import minipresto.test.test_cmd_env as test_env
 import minipresto.test.test_cmd_provision as test_provision
 import minipresto.test.test_cmd_remove as test_remove
 import minipresto.test.test_cmd_snapshot as test_snapshot
@@ -18,6 +19,7 @@ def main():
     test_misc.main()
     # test_config.main()
     test_down.main()
+    test_env.main()
     test_provision.main()
     test_remove.main()
     test_snapshot.main()
@@ -7,6 +7,9 @@ import minipresto.test.helpers as helpers
 from inspect import currentframe
 from types import FrameType
 from typing import cast
+from minipresto import utils
+from minipresto import errors as err
+from minipresto.components import Environment
 from minipresto.settings import RESOURCE_LABEL
 
 
@@ -17,6 +20,9 @@ def main():
     test_no_containers()
     test_running_containers()
     test_keep()
+    test_module()
+    test_module_keep_presto()
+    test_teardown_errors()
 
 
 def test_no_containers():
@@ -88,6 +94,99 @@ def test_keep():
     cleanup()
 
 
+def test_module():
+    """Verifies that the `--module` option only brings down the module's
+    containers and, with `--volumes`, its volumes."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    helpers.execute_command(["-v", "provision", "--module", "test"])
+    result = helpers.execute_command(
+        ["-v", "down", "--module", "test", "--volumes", "--sig-kill"]
+    )
+
+    assert result.exit_code == 0
+    assert all(
+        (
+            "Removed container" in result.output,
+            "Removed volume" in result.output,
+            "Recreating the Presto container" not in result.output,
+        )
+    )
+
+    docker_client = docker.from_env()
+    containers = docker_client.containers.list(
+        filters={"label": RESOURCE_LABEL}, all=True
+    )
+    assert [container.name for container in containers] == ["presto"]
+    volumes = docker_client.volumes.list(
+        filters={"label": "com.starburst.tests.module.test"}
+    )
+    assert len(volumes) == 0, "The test module's volume should be removed"
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
+def test_module_keep_presto():
+    """Verifies that `--keep` is rejected for a module that mounts files into the
+    Presto container, since Presto has to be recreated without them."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    helpers.execute_command(["-v", "provision", "--module", "postgres"])
+    result = helpers.execute_command(["-v", "down", "--module", "postgres", "--keep"])
+
+    assert result.exit_code == 2
+    assert "cannot be used with modules that mount files" in result.output
+
+    docker_client = docker.from_env()
+    containers = docker_client.containers.list(filters={"label": RESOURCE_LABEL})
+    assert len(containers) == 2, "Presto and Postgres should still be running"
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
+def test_teardown_errors():
+    """Verifies that a container that fails to be torn down does not keep the
+    others from being torn down, and that every failure is reported."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    ctx = Environment()
+    helpers.execute_command(["-v", "provision", "--module", "test"], obj=ctx)
+
+    docker_client = docker.from_env()
+    containers = docker_client.containers.list(filters={"label": RESOURCE_LABEL})
+    # Remove the test container behind Minipresto's back so that stopping and
+    # removing it fail
+    docker_client.containers.get("test").remove(force=True)
+
+    try:
+        utils.teardown_containers(ctx, containers, stop_timeout=1)
+        assert False, "Tearing down a missing container should fail"
+    except err.MiniprestoError as e:
+        message = str(e)
+
+    assert all(
+        (
+            "Failed to stop container" in message,
+            "Failed to remove container" in message,
+            "[Name: test]" in message,
+            "[Name: presto]" not in message,
+        )
+    )
+
+    containers = docker_client.containers.list(
+        filters={"label": RESOURCE_LABEL}, all=True
+    )
+    assert len(containers) == 0, "Presto should be torn down"
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
 def cleanup():
     """Stops/removes containers."""
 
@@ -0,0 +1,114 @@
+#!usr/bin/env/python3
+# -*- coding: utf-8 -*-
+
+import minipresto.test.helpers as helpers
+
+from inspect import currentframe
+from types import FrameType
+from typing import cast
+
+
+def main():
+    helpers.log_status(__file__)
+    test_library_env()
+    test_user_env()
+    test_key()
+    test_invalid_key()
+    test_scrub()
+
+
+def test_library_env():
+    """Ensures variables from the library's `minipresto.env` file are displayed
+    with their source."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    result = helpers.execute_command(["env"])
+
+    assert result.exit_code == 0
+    assert "COMPOSE_PROJECT_NAME=minipresto" in result.output
+    assert "minipresto.env]" in result.output
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+def test_user_env():
+    """Ensures `--env` variables override library variables and are reported as
+    coming from `--env`."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    result = helpers.execute_command(
+        ["--env", "COMPOSE_PROJECT_NAME=test", "--env", "FOO=bar", "env"]
+    )
+
+    assert result.exit_code == 0
+    assert all(
+        (
+            "COMPOSE_PROJECT_NAME=test [Source: --env]" in result.output,
+            "FOO=bar [Source: --env]" in result.output,
+        )
+    )
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+def test_key():
+    """Ensures specific variables can be displayed, case-insensitively."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    result = helpers.execute_command(
+        ["--env", "FOO=bar", "env", "--key", "foo", "--json"]
+    )
+
+    assert result.exit_code == 0
+    assert all(
+        (
+            '"FOO": {' in result.output,
+            '"value": "bar"' in result.output,
+            '"source": "--env"' in result.output,
+            "COMPOSE_PROJECT_NAME" not in result.output,
+        )
+    )
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+def test_invalid_key():
+    """Ensures Minipresto exits with a user error if a variable is not
+    found."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    result = helpers.execute_command(["env", "--key", "NOT_A_REAL_VAR"])
+
+    assert result.exit_code == 2
+    assert "Environment variable not found" in result.output
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+def test_scrub():
+    """Ensures sensitive values are scrubbed unless `--no-scrub` is passed."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    result = helpers.execute_command(["--env", "S3_SECRETKEY=hunter2", "env"])
+
+    assert result.exit_code == 0
+    assert "S3_SECRETKEY=********************" in result.output
+    assert "hunter2" not in result.output
+
+    result = helpers.execute_command(
+        ["--env", "S3_SECRETKEY=hunter2", "env", "--json", "--no-scrub"]
+    )
+
+    assert result.exit_code == 0
+    assert '"value": "hunter2"' in result.output
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+if __name__ == "__main__":
+    main()
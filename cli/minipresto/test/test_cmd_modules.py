@@ -2,9 +2,13 @@
 # -*- coding: utf-8 -*-
 
 import os
+import shutil
+import tempfile
 import subprocess
 import minipresto.test.helpers as helpers
 
+from minipresto.components import Environment
+
 from inspect import currentframe
 from types import FrameType
 from typing import cast
@@ -17,6 +21,9 @@ def main():
     test_all_modules()
     test_json()
     test_running()
+    test_running_presto_only()
+    test_module_cache()
+    test_lazy_yaml()
 
 
 def test_invalid_module():
@@ -101,5 +108,99 @@ def test_running():
     helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
 
 
+def test_running_presto_only():
+    """Ensures modules that only label the Presto container are reported as
+    running, along with modules that have containers of their own."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    helpers.execute_command(
+        ["-v", "provision", "--module", "password-file", "--module", "test"]
+    )
+    result = helpers.execute_command(["-v", "modules", "--json", "--running"])
+
+    assert result.exit_code == 0
+    assert all(
+        (
+            '"password-file": {' in result.output,
+            '"test": {' in result.output,
+            '"name": "presto"' in result.output,
+            '"name": "test"' in result.output,
+            "com.starburst.tests.module.password-file" in result.output,
+        )
+    )
+
+    helpers.execute_command(["-v", "down", "--sig-kill"])
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+def test_module_cache():
+    """Ensures modules are loaded from the module cache when unchanged and that
+    added and removed modules are picked up."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    tmp_dir = tempfile.mkdtemp()
+    lib_dir = os.path.join(tmp_dir, "lib")
+    shutil.copytree(os.path.join(helpers.MINIPRESTO_LIB_DIR, "lib"), lib_dir)
+    lib_env = f"LIB_PATH={lib_dir}"
+
+    try:
+        helpers.execute_command(["-v", "--env", lib_env, "modules"])
+        result = helpers.execute_command(["-v", "--env", lib_env, "modules"])
+
+        assert result.exit_code == 0
+        assert "Parsed 0 module(s)" in result.output
+
+        # Add a module
+        catalog_dir = os.path.join(lib_dir, "modules", "catalog")
+        shutil.copytree(
+            os.path.join(catalog_dir, "test"), os.path.join(catalog_dir, "test2")
+        )
+        os.rename(
+            os.path.join(catalog_dir, "test2", "test.yml"),
+            os.path.join(catalog_dir, "test2", "test2.yml"),
+        )
+        result = helpers.execute_command(["-v", "--env", lib_env, "modules"])
+
+        assert result.exit_code == 0
+        assert all(
+            ("Parsed 1 module(s)" in result.output, "Module: test2" in result.output)
+        )
+
+        # Remove the module
+        shutil.rmtree(os.path.join(catalog_dir, "test2"))
+        result = helpers.execute_command(["-v", "--env", lib_env, "modules"])
+
+        assert result.exit_code == 0
+        assert "Module: test2" not in result.output
+    finally:
+        shutil.rmtree(tmp_dir)
+        # Reset the cache to point at the default library
+        helpers.execute_command(["-v", "modules"], print_output=False)
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+def test_lazy_yaml():
+    """Ensures module Compose YAML is not parsed when only printing module
+    metadata."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    ctx = Environment()
+    result = helpers.execute_command(["-v", "modules"], obj=ctx)
+
+    assert result.exit_code == 0
+    assert all(module._yaml_dict is None for module in ctx.modules.data.values())
+
+    result = helpers.execute_command(["-v", "modules", "--module", "test", "--json"])
+
+    assert result.exit_code == 0
+    assert '"yaml_dict":' in result.output
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
 if __name__ == "__main__":
     main()
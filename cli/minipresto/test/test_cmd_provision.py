@@ -1,18 +1,23 @@
 #!usr/bin/env/python3
 # -*- coding: utf-8 -*-
 
-# TODO: Test no rollback
 # TODO: Test invalid user config (Presto/JVM)
 
 import os
+import re
+import json
+import shutil
+import tempfile
 import docker
 import time
 import subprocess
 import minipresto.test.helpers as helpers
 
+from contextlib import contextmanager
 from inspect import currentframe
 from types import FrameType
 from typing import cast
+from minipresto.components import Environment
 from minipresto.settings import RESOURCE_LABEL
 
 
@@ -27,6 +32,14 @@ def main():
     test_duplicate_config_props()
     test_incompatible_modules()
     test_provision_append()
+    test_plan()
+    test_fingerprint()
+    test_scoped_rollback()
+    test_resume()
+    test_trace()
+    test_unchanged_config()
+    test_restart_order()
+    test_container_files()
 
 
 def test_standalone():
@@ -290,6 +303,345 @@ def test_provision_append():
     cleanup()
 
 
+def test_plan():
+    """Verifies that `--plan` displays which services would change without
+    changing the environment."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    helpers.execute_command(["-v", "provision", "--module", "test"])
+    result = helpers.execute_command(
+        ["-v", "provision", "--module", "test", "--module", "postgres", "--plan"]
+    )
+
+    assert result.exit_code == 0
+    assert "Provisioning plan:" in result.output
+    assert re.search(r"create\s+postgres", result.output)
+    assert re.search(r"unchanged\s+test", result.output)
+    # The postgres module mounts a catalog file into Presto
+    assert re.search(r"recreate\s+presto", result.output)
+
+    containers = get_containers()
+    assert len(containers) == 2  # presto and test
+
+    # Native Compose options may affect any service, so there is no plan
+    result = helpers.execute_command(
+        ["-v", "provision", "--module", "test", "--docker-native", "--build", "--plan"]
+    )
+
+    assert result.exit_code == 0
+    assert "Incremental provisioning is unavailable" in result.output
+    assert "Provisioning plan:" not in result.output
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
+def test_fingerprint():
+    """Verifies that a provision with unchanged inputs is skipped, and that a
+    module brought down with `down --module` is provisioned again."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    helpers.execute_command(["-v", "provision", "--module", "test"])
+    result = helpers.execute_command(["-v", "provision", "--module", "test"])
+
+    assert result.exit_code == 0
+    assert "Environment is up to date" in result.output
+
+    helpers.execute_command(["-v", "down", "--module", "test", "--sig-kill"])
+    result = helpers.execute_command(["-v", "provision", "--module", "test"])
+
+    assert result.exit_code == 0
+    assert "Environment is up to date" not in result.output
+
+    containers = get_containers()
+    assert sorted(container.name for container in containers) == ["presto", "test"]
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
+def test_scoped_rollback():
+    """Verifies that a failed provision only rolls back the containers it
+    created or recreated, leaving containers that were already running
+    alone."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    helpers.execute_command(["-v", "provision", "--module", "postgres"])
+    postgres_id = get_container("postgres").id
+
+    with broken_bootstrap("bootstrap-test.sh"):
+        result = helpers.execute_command(
+            ["-v", "provision", "--module", "postgres", "--module", "test"]
+        )
+
+    assert result.exit_code != 0
+    assert "Rolling back provisioned resources" in result.output
+
+    # Presto is recreated by the test module, so it is rolled back as well
+    containers = get_containers()
+    assert [container.name for container in containers] == ["postgres"]
+    assert containers[0].id == postgres_id
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
+def test_resume():
+    """Verifies that a provision that failed with `--no-rollback` can be
+    resumed once the failure is fixed."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    journal = os.path.join(helpers.MINIPRESTO_USER_DIR, "state", "provision.json")
+
+    # Nothing to resume if no phase completed
+    result = helpers.execute_command(
+        [
+            "-v",
+            "provision",
+            "--module",
+            "test",
+            "--no-rollback",
+            "--docker-native",
+            "--not-a-real-option",
+        ]
+    )
+
+    assert result.exit_code != 0
+    assert "minipresto provision --resume" not in result.output
+
+    with broken_bootstrap("bootstrap-test.sh"):
+        result = helpers.execute_command(
+            ["-v", "provision", "--module", "test", "--no-rollback"]
+        )
+
+    assert result.exit_code != 0
+    assert "minipresto provision --resume" in result.output
+    assert os.path.isfile(journal)
+
+    result = helpers.execute_command(["-v", "provision", "--resume"])
+
+    assert result.exit_code == 0
+    assert "Environment provisioning complete" in result.output
+    assert not os.path.isfile(journal)
+
+    test_bootstrap_check = subprocess.Popen(
+        f"docker exec -i test cat /root/test_bootstrap.txt",
+        shell=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    test_bootstrap_check, _ = test_bootstrap_check.communicate()
+    assert "hello world" in test_bootstrap_check
+
+    result = helpers.execute_command(["-v", "provision", "--resume"])
+
+    assert result.exit_code == 2
+    assert "No incomplete provision to resume" in result.output
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
+def test_trace():
+    """Verifies that `--trace` writes the provision's spans in Chrome's
+    trace-event format, with a summary of the time spent in each phase."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    trace_file = os.path.join(helpers.MINIPRESTO_USER_DIR, "trace.json")
+    if os.path.isfile(trace_file):
+        os.remove(trace_file)
+
+    result = helpers.execute_command(
+        ["-v", "provision", "--module", "test", "--trace", trace_file]
+    )
+
+    assert result.exit_code == 0
+    assert "Time per phase:" in result.output
+    assert "Provisioning trace written to" in result.output
+
+    with open(trace_file) as f:
+        trace = json.load(f)
+
+    events = trace["traceEvents"]
+    assert all(event["ph"] == "X" for event in events)
+    assert any(event["cat"] == "docker" for event in events)
+    assert any(event["name"] == "docker-compose up" for event in events)
+
+    phases = trace["otherData"]["phases"]
+    for phase in ("execute_bootstraps", "restart_containers"):
+        assert phase in phases, f"Phase missing from trace: {phase}"
+        assert phases[phase] >= 0
+
+    os.remove(trace_file)
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
+def test_unchanged_config():
+    """Verifies that Presto is not restarted when a provision leaves its config
+    files unchanged."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    config = "CONFIG=query.max-stage-count=85\nquery.max-execution-time=1h"
+    helpers.execute_command(["-v", "--env", config, "provision", "--module", "test"])
+    started_at = get_container("presto").attrs["State"]["StartedAt"]
+
+    # An unused variable changes the provisioning fingerprint, but not the
+    # services or the Presto config
+    result = helpers.execute_command(
+        [
+            "-v",
+            "--env",
+            config,
+            "--env",
+            "UNUSED_VAR=1",
+            "provision",
+            "--module",
+            "test",
+        ]
+    )
+
+    assert result.exit_code == 0
+    assert "Presto config.properties is unchanged" in result.output
+    assert "Restarting container 'presto'" not in result.output
+    assert get_container("presto").attrs["State"]["StartedAt"] == started_at
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
+def test_restart_order():
+    """Verifies that containers are restarted after the containers they depend
+    on."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    # Make Presto depend on the test container in a copy of the library
+    tmp_dir = tempfile.mkdtemp()
+    lib_dir = os.path.join(tmp_dir, "lib")
+    shutil.copytree(os.path.join(helpers.MINIPRESTO_LIB_DIR, "lib"), lib_dir)
+    yaml_file = os.path.join(lib_dir, "modules", "catalog", "test", "test.yml")
+    with open(yaml_file) as f:
+        yaml = f.read()
+    with open(yaml_file, "w") as f:
+        f.write(
+            yaml.replace(
+                'MINIPRESTO_BOOTSTRAP: "bootstrap-presto.sh"',
+                'MINIPRESTO_BOOTSTRAP: "bootstrap-presto.sh"\n'
+                '    depends_on:\n      - "test"',
+            )
+        )
+
+    try:
+        result = helpers.execute_command(
+            ["-v", "--env", f"LIB_PATH={lib_dir}", "provision", "--module", "test"]
+        )
+
+        assert result.exit_code == 0
+        test_restart = result.output.index("Restarting container 'test'")
+        presto_restart = result.output.index("Restarting container 'presto'")
+        assert test_restart < presto_restart, "Presto was restarted before test"
+        assert (
+            get_container("test").attrs["State"]["StartedAt"]
+            < get_container("presto").attrs["State"]["StartedAt"]
+        )
+    finally:
+        cleanup()
+        shutil.rmtree(tmp_dir)
+        # Reset the module cache to point at the default library
+        helpers.execute_command(["-v", "modules"], print_output=False)
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+def test_container_files():
+    """Verifies that files in containers can be read, written, and appended to,
+    including files bind-mounted from the host (which can't be replaced by a
+    rename, so they are copied over in place)."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    ctx = Environment()
+    helpers.execute_command(["-v", "provision", "--module", "postgres"], obj=ctx)
+    presto = get_container("presto")
+    files = ctx.container_files
+
+    config_file = "/usr/lib/presto/etc/config.properties"
+    config = files.read_file(presto, config_file)
+    assert config, "Presto's config.properties should not be empty"
+    files.append_file(presto, config_file, "query.max-stage-count=85\n")
+    assert files.read_file(presto, config_file) == f"{config}query.max-stage-count=85\n"
+
+    new_file = "/tmp/minipresto-test.txt"
+    assert files.read_file(presto, new_file, "missing") == "missing"
+    files.write_file(presto, new_file, "hello\r\nworld\n")
+    assert files.read_file(presto, new_file) == "hello\r\nworld\n"
+
+    catalog_file = "/usr/lib/presto/etc/catalog/postgres.properties"
+    host_file = os.path.join(
+        helpers.MINIPRESTO_LIB_DIR,
+        "lib",
+        "modules",
+        "catalog",
+        "postgres",
+        "resources",
+        "presto",
+        "postgres.properties",
+    )
+    with open(host_file) as f:
+        original = f.read()
+    try:
+        files.append_file(presto, catalog_file, "# appended\n")
+        assert files.read_file(presto, catalog_file) == f"{original}# appended\n"
+        with open(host_file) as f:
+            assert f.read() == f"{original}# appended\n"
+    finally:
+        with open(host_file, "w") as f:
+            f.write(original)
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+    cleanup()
+
+
+@contextmanager
+def broken_bootstrap(script=""):
+    """Temporarily replaces one of the test module's bootstrap scripts with a
+    script that fails."""
+
+    path = os.path.join(
+        helpers.MINIPRESTO_LIB_DIR,
+        "lib",
+        "modules",
+        "catalog",
+        "test",
+        "resources",
+        "bootstrap",
+        script,
+    )
+    with open(path) as f:
+        original = f.read()
+    with open(path, "w") as f:
+        f.write("#!/usr/bin/env bash\n\nexit 1\n")
+    try:
+        yield
+    finally:
+        with open(path, "w") as f:
+            f.write(original)
+
+
+def get_container(name=""):
+    """Returns a Minipresto container by name."""
+
+    docker_client = docker.from_env()
+    return docker_client.containers.get(name)
+
+
 def get_containers():
     """Returns all running minipresto containers."""
 
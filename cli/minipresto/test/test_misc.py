@@ -4,8 +4,10 @@
 # TODO: Test docker host
 # TODO: Test symlink paths (should work with os.environ() registered in subproc)
 
+import os
 import minipresto.test.helpers as helpers
 
+from minipresto.components import Environment
 from inspect import currentframe
 from types import FrameType
 from typing import cast
@@ -29,6 +31,9 @@ def main():
     test_multiple_env()
     test_invalid_env()
     test_invalid_lib()
+    test_lazy_init()
+    test_invalid_docker_config()
+    test_log_file()
 
 
 def test_daemon_off_all(*args):
@@ -145,5 +150,69 @@ def test_invalid_lib():
     helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
 
 
+def test_lazy_init():
+    """Verifies that modules and Docker clients are only built for the commands
+    that use them."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    # Command -> (modules loaded, Docker clients created)
+    expected = [
+        (["version"], False, False),
+        (["modules", "--module", "test"], True, False),
+        (["-v", "down"], False, True),
+        (["-v", "remove", "--images", "--label", "not-a-real-label"], False, True),
+    ]
+
+    for command, modules_loaded, docker_loaded in expected:
+        ctx = Environment()
+        helpers.execute_command(command, obj=ctx)
+        assert (
+            ctx._modules is not None
+        ) == modules_loaded, f"Unexpected module loading for command: {command}"
+        assert (
+            ctx._docker_clients_set == docker_loaded
+        ), f"Unexpected Docker client creation for command: {command}"
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+def test_invalid_docker_config():
+    """Verifies that an invalid Docker connection setting causes the CLI to exit
+    with a user error."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    result = helpers.execute_command(["-v", "--env", "DOCKER_POOL_SIZE=many", "down"])
+
+    assert result.exit_code == 2
+    assert "Invalid value for environment variable 'DOCKER_POOL_SIZE'" in result.output
+
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
+def test_log_file():
+    """Verifies that `--log-file` writes unformatted output, including verbose
+    output, to a file."""
+
+    helpers.log_status(cast(FrameType, currentframe()).f_code.co_name)
+
+    log_file = os.path.join(helpers.MINIPRESTO_USER_DIR, "test.log")
+    if os.path.isfile(log_file):
+        os.remove(log_file)
+
+    result = helpers.execute_command(["--log-file", log_file, "version"])
+
+    assert result.exit_code == 0
+    with open(log_file) as f:
+        contents = f.read()
+    assert "Library path set to" in contents
+    assert "Minipresto version:" in contents
+    assert "[i]" not in contents
+
+    os.remove(log_file)
+    helpers.log_success(cast(FrameType, currentframe()).f_code.co_name)
+
+
 if __name__ == "__main__":
     main()
@@ -3,30 +3,54 @@
 
 import os
 import sys
+import json
+import time
+import click
+import atexit
+import signal
+import threading
 import traceback
 import pkg_resources
 
 from minipresto import errors as err
 from minipresto.settings import DEFAULT_INDENT
+from minipresto.settings import DOCKER_POOL_SIZE
+from minipresto.settings import STOP_GRACE_PERIOD
+from minipresto.settings import STREAM_BUFFER_LINES
+from minipresto.settings import STREAM_FLUSH_INTERVAL
 
 from click import echo, style, prompt
 from textwrap import fill
 from shutil import get_terminal_size
 from functools import wraps
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_EXCEPTION
+from concurrent.futures import wait
 
 
 class Logger:
-    """Minipresto logging class. The logger does not log to a file; it uses
-    `click.echo()` to print text to the user's terminal.
+    """Minipresto logging class. The logger uses `click.echo()` to print text
+    to the user's terminal, and can optionally write raw, unformatted messages
+    to a log file.
 
     The log level will affect the prefix color (i.e. the '[i]' in info messages
     is blue) and the message prefix (the prefix for the warning logs is '[w]').
 
+    Streamed lines (`stream=True`) take a fast path: the terminal width is
+    cached (and refreshed on `SIGWINCH`), lines are only wrapped when stdout is
+    a terminal, and writes are batched. Buffered lines are flushed once the
+    buffer is full or within `STREAM_FLUSH_INTERVAL` seconds, even if no more
+    output arrives.
+
     ### Parameters
     - `log_verbose`: If `True`, log messages flagged as verbose will be logged.
       If `False`, verbose messages will not be logged. This is dynamically
       determined by user input when the logger is instantiated from the
       Environment class.
+    - `log_file`: Path to a file that all messages (including verbose messages)
+      are appended to, without prefixes or formatting.
 
     ### Public Attributes
     - `info`: Info log level.
@@ -36,9 +60,17 @@ class Logger:
 
     ### Public Methods
     - `log()`: Logs a message to the user's terminal.
-    - `prompt_msg()`: Logs a prompt message and returns the user's input."""
+    - `is_enabled()`: Returns `True` if messages at a log level are written to
+      the terminal or the log file.
+    - `flush()`: Writes any buffered streamed lines to the user's terminal.
+    - `prompt_msg()`: Logs a prompt message and returns the user's input.
+
+    The logger is thread-safe."""
 
-    def __init__(self, log_verbose=False):
+    # Shared by all loggers; reset by the SIGWINCH handler
+    _terminal_width = None
+
+    def __init__(self, log_verbose=False, log_file=None):
 
         self.info = {"prefix": "[i]  ", "prefix_color": "cyan"}
         self.warn = {"prefix": "[w]  ", "prefix_color": "yellow"}
@@ -46,6 +78,26 @@ class Logger:
         self.verbose = {"prefix": "[i]  ", "prefix_color": "cyan", "verbose": True}
 
         self._log_verbose = log_verbose
+        self._lock = threading.RLock()
+        self._wrap = sys.stdout.isatty()
+        self._stream_buffer = []
+        self._stream_lines = 0
+        self._last_flush = time.monotonic()
+        self._flush_timer = None
+        self._log_file = None
+
+        if log_file:
+            try:
+                self._log_file = open(log_file, "a")
+            except OSError as e:
+                raise err.UserError(
+                    f"Cannot open log file: {log_file}",
+                    f"Error from the filesystem: {str(e)}",
+                )
+
+        if self._wrap:
+            _watch_terminal_size()
+        atexit.register(self.close)
 
     def log(self, *args, level=None, stream=False):
         """Logs messages to the user's console. Defaults to 'info' log level.
@@ -55,14 +107,26 @@ class Logger:
         - `level`: The level of the log message (info, warn, error, and
           verbose).
         - `stream`: If `True`, the logger will not apply a prefix to each line
-          streamed to the console."""
+          streamed to the console, and lines are buffered and written in
+          batches."""
 
         if not level:
             level = self.info
 
-        # Skip verbose messages unless verbose mode is enabled
-        if not self._log_verbose and level == self.verbose:
-            return
+        with self._lock:
+            self._log(args, level, stream)
+
+    def is_enabled(self, level=None):
+        """Returns `True` if messages at the given log level are written to the
+        user's terminal or the log file. Callers can skip building messages
+        that would be discarded."""
+
+        if not level:
+            level = self.info
+        return self._log_file is not None or self._log_verbose or level != self.verbose
+
+    def _log(self, args, level, stream):
+        """Logs messages. Must be called with the logger lock held."""
 
         for msg in args:
             # Ensure the message can be a string
@@ -72,13 +136,25 @@ class Logger:
                 raise err.MiniprestoError(
                     f"A string is required for {self.log.__name__}."
                 )
+            if self._log_file:
+                self._log_file.write(msg if msg.endswith("\n") else f"{msg}\n")
+
+            # Skip verbose messages unless verbose mode is enabled
+            if not self._log_verbose and level == self.verbose:
+                continue
+
+            if stream:
+                self._stream(msg)
+                continue
+
+            self.flush()
             msgs = msg.replace("\r", "\n").split("\n")
             # Log each message
             for i, msg in enumerate(msgs):
                 msg = self._format(msg)
                 if not msg:
                     continue
-                if stream or i > 0:
+                if i > 0:
                     msg_prefix = DEFAULT_INDENT
                 else:
                     msg_prefix = style(
@@ -88,6 +164,31 @@ class Logger:
                     )
                 echo(f"{msg_prefix}{msg}")
 
+    def flush(self):
+        """Writes any buffered streamed lines to the user's terminal."""
+
+        with self._lock:
+            if self._stream_buffer:
+                # Streamed command output is stripped of ANSI escape sequences
+                # before it is logged, so Click doesn't need to strip it again
+                echo("".join(self._stream_buffer), nl=False, color=True)
+                self._stream_buffer = []
+                self._stream_lines = 0
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flushes buffered output and closes the log file, if any."""
+
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self.flush()
+            if self._log_file:
+                self._log_file.close()
+                self._log_file = None
+        atexit.unregister(self.close)
+
     def prompt_msg(self, msg="", input_type=str):
         """Logs a prompt message and returns the user's input.
 
@@ -103,6 +204,7 @@ class Logger:
         except:
             raise err.MiniprestoError(f"A string is required for {self.log.__name__}.")
 
+        self.flush()
         msg = self._format(msg)
         styled_prefix = style(
             self.info.get("prefix", ""), fg=self.info.get("prefix_color", ""), bold=True
@@ -113,18 +215,61 @@ class Logger:
             type=input_type,
         )
 
+    def _stream(self, msg):
+        """Buffers streamed lines, flushing when the buffer is full or the
+        flush interval has passed. Otherwise, a timer flushes the buffer once
+        the interval passes."""
+
+        lines = msg.replace("\r", "\n").split("\n")
+        if self._wrap:
+            lines = [line for line in map(self._format, lines) if line]
+        else:
+            # Without wrapping, formatting a line only strips it
+            lines = [line for line in map(str.rstrip, lines) if line]
+        if lines:
+            separator = f"\n{DEFAULT_INDENT}"
+            self._stream_buffer.append(f"{DEFAULT_INDENT}{separator.join(lines)}\n")
+            self._stream_lines += len(lines)
+
+        elapsed = time.monotonic() - self._last_flush
+        if self._stream_lines >= STREAM_BUFFER_LINES or (
+            elapsed >= STREAM_FLUSH_INTERVAL
+        ):
+            self.flush()
+        elif self._stream_buffer and self._flush_timer is None:
+            self._flush_timer = threading.Timer(
+                STREAM_FLUSH_INTERVAL - elapsed, self._flush_on_timer
+            )
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _flush_on_timer(self):
+        """Flushes the buffer from the flush timer's thread."""
+
+        with self._lock:
+            self._flush_timer = None
+            self.flush()
+
     def _format(self, msg):
-        """Formats strings prior to displaying to the user."""
+        """Formats strings prior to displaying to the user. Lines are only
+        wrapped when stdout is a terminal."""
 
         msg = msg.rstrip()
         if not msg:
             return ""
 
-        terminal_width, _ = get_terminal_size()
         msg = msg.replace("\n", f"\n{DEFAULT_INDENT}")
+        if not self._wrap:
+            return msg
+
+        if Logger._terminal_width is None:
+            Logger._terminal_width, _ = get_terminal_size()
+        if len(msg) <= Logger._terminal_width:
+            return msg
+
         msg = fill(
             msg,
-            terminal_width,
+            Logger._terminal_width,
             subsequent_indent=DEFAULT_INDENT,
             replace_whitespace=False,
             break_on_hyphens=False,
@@ -134,6 +279,189 @@ class Logger:
         return msg
 
 
+def _watch_terminal_size():
+    """Installs a `SIGWINCH` handler (once) that resets the cached terminal
+    width so that it is re-read on the next log message. This is a no-op on
+    platforms without `SIGWINCH` or outside of the main thread."""
+
+    global _watching_terminal_size
+    if _watching_terminal_size or not hasattr(signal, "SIGWINCH"):
+        return
+
+    previous_handler = signal.getsignal(signal.SIGWINCH)
+
+    def handler(signum, frame):
+        Logger._terminal_width = None
+        if callable(previous_handler):
+            previous_handler(signum, frame)
+
+    try:
+        signal.signal(signal.SIGWINCH, handler)
+        _watching_terminal_size = True
+    except ValueError:
+        pass
+
+
+_watching_terminal_size = False
+
+
+class Tracer:
+    """Records timed spans of work, such as provisioning phases, Docker API
+    calls, and commands. Spans can be exported in Chrome's trace-event format
+    (viewable in `chrome://tracing` or Perfetto) and summarized per phase.
+    Spans may be recorded from any thread.
+
+    ### Public Attributes
+    - `spans`: A list of recorded spans. Each span is a dictionary with `name`,
+      `category`, `start` and `end` (seconds since the tracer was created),
+      `thread`, and `args` keys.
+
+    ### Public Methods
+    - `span()`: A context manager that records a span.
+    - `instrument_docker()`: Records a span for each request an `APIClient`
+      sends to the Docker daemon.
+    - `phase_summary()`: Returns the wall time spent in each phase.
+    - `log_summary()`: Logs a table of the wall time spent in each phase.
+    - `to_chrome_trace()`: Returns the spans in Chrome's trace-event format.
+    - `write()`: Writes the Chrome trace to a file.
+
+    ### Usage
+    ```python
+    with ctx.tracer.span("initialize_containers"):
+        initialize_containers()
+    ctx.tracer.write("trace.json")
+    ```"""
+
+    PHASE = "phase"
+
+    def __init__(self):
+
+        self.spans = []
+
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._threads = {}
+
+    @contextmanager
+    def span(self, name="", category=PHASE, **args):
+        """Records the time spent in the `with` block as a span.
+
+        ### Parameters
+        - `name`: The span name.
+        - `category`: The span category. Spans in the `phase` category are
+          included in the phase summary.
+        - `args`: Extra data to attach to the span."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                thread = self._threads.setdefault(
+                    threading.get_ident(), len(self._threads)
+                )
+                self.spans.append(
+                    {
+                        "name": name,
+                        "category": category,
+                        "start": start - self._origin,
+                        "end": end - self._origin,
+                        "thread": thread,
+                        "args": args,
+                    }
+                )
+
+    def instrument_docker(self, api_client=None):
+        """Wraps an `APIClient`'s `send()` method so that every request to the
+        Docker daemon is recorded as a span in the `docker` category.
+
+        ### Parameters
+        - `api_client`: A `docker.APIClient` object."""
+
+        send = api_client.send
+
+        @wraps(send)
+        def traced_send(request, **kwargs):
+            path = request.path_url.split("?", 1)[0]
+            with self.span(f"{request.method} {path}", "docker"):
+                return send(request, **kwargs)
+
+        api_client.send = traced_send
+
+    def phase_summary(self):
+        """Returns a list of `(phase, seconds, count)` tuples in the order the
+        phases first started. Phases that ran more than once are summed."""
+
+        summary = {}
+        phases = sorted(
+            (s for s in self.spans if s["category"] == self.PHASE),
+            key=lambda s: s["start"],
+        )
+        for phase in phases:
+            seconds, count = summary.get(phase["name"], (0.0, 0))
+            summary[phase["name"]] = (
+                seconds + phase["end"] - phase["start"],
+                count + 1,
+            )
+        return [(name, seconds, count) for name, (seconds, count) in summary.items()]
+
+    def log_summary(self, logger=None):
+        """Logs a table of the wall time spent in each phase.
+
+        ### Parameters
+        - `logger`: A `Logger` object."""
+
+        summary = self.phase_summary()
+        if not summary:
+            return
+        total = sum(seconds for _, seconds, _ in summary)
+        width = max(len(name) for name, _, _ in summary)
+        lines = ["Time per phase:"]
+        for name, seconds, count in summary:
+            runs = f" ({count} runs)" if count > 1 else ""
+            lines.append(
+                f"  {name:<{width}}  {seconds:8.2f}s  "
+                f"{100 * seconds / (total or 1):5.1f}%{runs}"
+            )
+        logger.log("\n".join(lines))
+
+    def to_chrome_trace(self):
+        """Returns the recorded spans as a Chrome trace-event dictionary. The
+        phase summary is included under `otherData`."""
+
+        with self._lock:
+            spans = list(self.spans)
+        events = [
+            {
+                "name": s["name"],
+                "cat": s["category"],
+                "ph": "X",
+                "ts": round(s["start"] * 1e6, 3),
+                "dur": round((s["end"] - s["start"]) * 1e6, 3),
+                "pid": os.getpid(),
+                "tid": s["thread"],
+                "args": {k: str(v) for k, v in s["args"].items()},
+            }
+            for s in spans
+        ]
+        phases = {name: round(seconds, 6) for name, seconds, _ in self.phase_summary()}
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"phases": phases},
+        }
+
+    def write(self, path=""):
+        """Writes the Chrome trace to a JSON file.
+
+        ### Parameters
+        - `path`: The file to write."""
+
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+
 def handle_exception(error=Exception, additional_msg="", skip_traceback=False):
     """Handles a single exception. Wrapped by `@exception_handler` decorator.
 
@@ -220,6 +548,129 @@ def handle_missing_param(params=[]):
     return err.MiniprestoError(f"Parameters {params} required to execute function.")
 
 
+def run_concurrently(func, args_list=[], max_workers=1):
+    """Calls a function once for each set of arguments across a thread pool and
+    returns the results in the order of `args_list`. The current Click context
+    is made available in the worker threads, so functions decorated with
+    `pass_environment` can be used.
+
+    If any call raises an exception, calls that have not started are
+    cancelled, calls in progress are allowed to finish, and the exception of
+    the first failed call (in the order of `args_list`) is raised.
+
+    ### Parameters
+    - `func`: The function to call.
+    - `args_list`: A list of argument tuples, one per call.
+    - `max_workers`: The maximum number of concurrent calls.
+
+    ### Usage
+    ```python
+    # Calls stop_container("presto") and stop_container("ldap") concurrently
+    results = run_concurrently(stop_container, [("presto",), ("ldap",)], 2)
+    ```"""
+
+    if not args_list:
+        return []
+
+    click_ctx = click.get_current_context(silent=True)
+
+    def call(args):
+        if click_ctx is None:
+            return func(*args)
+        with click_ctx.scope(cleanup=False):
+            return func(*args)
+
+    max_workers = max(1, min(max_workers, len(args_list)))
+    if max_workers == 1:
+        return [func(*args) for args in args_list]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(call, args) for args in args_list]
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in not_done:
+            future.cancel()
+        wait(futures)
+
+    for future in futures:
+        if not future.cancelled() and future.exception() is not None:
+            raise future.exception()
+    return [future.result() for future in futures]
+
+
+def parse_docker_timestamp(timestamp=""):
+    """Parses an RFC 3339 timestamp from the Docker API, e.g.
+    `2020-11-04T19:03:12.123456789Z`, and returns it as a Unix timestamp.
+    Fractional seconds beyond microseconds are truncated."""
+
+    if not timestamp:
+        raise handle_missing_param(["timestamp"])
+
+    seconds, _, fraction = timestamp.rstrip("Z").partition(".")
+    parsed = datetime.strptime(seconds, "%Y-%m-%dT%H:%M:%S")
+    parsed = parsed.replace(tzinfo=timezone.utc).timestamp()
+    if fraction:
+        parsed += float(f"0.{fraction[:6]}")
+    return parsed
+
+
+def teardown_containers(
+    ctx, containers=[], stop_timeout=STOP_GRACE_PERIOD, remove=True
+):
+    """Stops, then optionally removes, containers. All stops are issued
+    concurrently (bounded by the Docker connection pool size), followed by all
+    removals. A failure for one container does not prevent the others from
+    being torn down; failures are raised together once every container has
+    been handled.
+
+    ### Parameters
+    - `ctx`: Instantiated Environment object.
+    - `containers`: Docker container objects.
+    - `stop_timeout`: Seconds each container has to stop before it is killed.
+    - `remove`: If `True`, containers are removed after they are stopped.
+
+    ### Return Values
+    - A dictionary of container names to dictionaries of the seconds spent on
+      each operation, e.g. `{"presto": {"stop": 1.2, "remove": 0.1}}`."""
+
+    if not ctx:
+        raise handle_missing_param(["ctx"])
+
+    timings = {container.name: {} for container in containers}
+    errors = []
+    max_workers = ctx.env.get_int_var("DOCKER_POOL_SIZE", DOCKER_POOL_SIZE)
+
+    def operate(operation, container):
+        identifier = generate_identifier(
+            {"ID": container.short_id, "Name": container.name}
+        )
+        start = time.perf_counter()
+        try:
+            with ctx.tracer.span(f"{operation} {container.name}", "teardown"):
+                if operation == "stop":
+                    container.stop(timeout=stop_timeout)
+                else:
+                    container.remove()
+        except Exception as e:
+            errors.append(f"Failed to {operation} container {identifier}: {e}")
+            return
+        seconds = time.perf_counter() - start
+        timings[container.name][operation] = seconds
+        past_tense = "Stopped" if operation == "stop" else "Removed"
+        ctx.logger.log(
+            f"{past_tense} container: {identifier} ({seconds:.1f}s)",
+            level=ctx.logger.verbose,
+        )
+
+    to_stop = [c for c in containers if c.status not in ("created", "exited", "dead")]
+    run_concurrently(operate, [("stop", c) for c in to_stop], max_workers)
+    if remove:
+        run_concurrently(operate, [("remove", c) for c in containers], max_workers)
+
+    if errors:
+        raise err.MiniprestoError("\n".join(errors))
+    return timings
+
+
 def check_daemon(docker_client):
     """Checks if the Docker daemon is running. If an exception is thrown, it is
     handled."""
@@ -6,9 +6,6 @@
 
 set -euxo pipefail
 
-echo "Waiting for Elasticsearch to come up..."
-/opt/minipresto/wait-for-it.sh elasticsearch:9200 --strict --timeout=60 -- echo "Elasticsearch service is up."
-
 echo "Creating user index..."
 curl -XPUT http://localhost:9200/user?pretty=true;
 
@@ -3,9 +3,6 @@
 set -euxo pipefail
 export LDAPTLS_REQCERT=never
 
-echo "Waiting for LDAP to come up..."
-/opt/minipresto/wait-for-it.sh ldap:636 --strict --timeout=60 -- echo "LDAP service is up."
-
 echo "Creating certs directory..."
 PRESTO_CERTS=/usr/lib/presto/etc/certs
 if [ ! -d "${PRESTO_CERTS}" ]; then
@@ -2,9 +2,6 @@
 
 set -euxo pipefail
 
-echo "Waiting for Ranger Admin to come up..."
-/opt/minipresto/wait-for-it.sh ranger-admin:6080 --strict --timeout=150 -- echo "Ranger Admin service is up."
-
 function create_sep_service() {
    curl -i -v -X POST -u admin:prestoRocks15 --header 'Content-Type: application/json' --header 'Accept: application/json' -d '
    {